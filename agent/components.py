@@ -0,0 +1,107 @@
+"""
+Voice pipeline components shared by the agent entrypoints
+Plugin objects are cached per worker process so later jobs reuse them
+"""
+
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def get_vad(min_speech: float, min_silence: float):
+    """Load the Silero VAD model once per (min_speech, min_silence) pair"""
+    from livekit.plugins import silero
+
+    return silero.VAD.load(
+        min_speech_duration=min_speech,
+        min_silence_duration=min_silence
+    )
+
+
+@lru_cache(maxsize=4)
+def get_stt(model: str, language: Optional[str]):
+    """Build the OpenAI STT client once per (model, language) pair"""
+    from livekit.plugins import openai
+
+    return openai.STT(model=model, language=language)
+
+
+@lru_cache(maxsize=4)
+def get_deepgram_stt(model: str, language: Optional[str]):
+    """
+    Build a streaming Deepgram STT client with interim transcripts
+
+    Raises ImportError when livekit-plugins-deepgram is not installed.
+    """
+    from livekit.plugins import deepgram
+
+    if language:
+        return deepgram.STT(model=model, language=language, interim_results=True)
+    return deepgram.STT(model=model, interim_results=True)
+
+
+def stt_from_config(config):
+    """Pick the STT client for config.stt_provider, falling back to OpenAI"""
+    language = config.stt_language if config.stt_language != "auto" else None
+    if config.stt_provider == "deepgram":
+        try:
+            return get_deepgram_stt(config.deepgram_model, language)
+        except ImportError:
+            logger.warning("Deepgram plugin not available - falling back to OpenAI STT")
+    return get_stt(config.stt_model, language)
+
+
+@lru_cache(maxsize=4)
+def get_tts(model: str, voice: str, speed: float):
+    """Build the OpenAI TTS client once per (model, voice, speed) triple"""
+    from livekit.plugins import openai
+
+    return openai.TTS(model=model, voice=voice, speed=speed)
+
+
+@lru_cache(maxsize=4)
+def get_llm(model: str, temperature: float, max_tokens: int):
+    """
+    Build a chat-completions LLM once per (model, temperature, max_tokens) triple
+
+    Only share this when tools are registered on the agent rather than
+    on the LLM itself, otherwise registrations leak between jobs.
+    """
+    from livekit.plugins import openai
+
+    return openai.LLM(model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+@lru_cache(maxsize=2)
+def get_assistant_llm(assistant_id: str):
+    """Build the OpenAI Assistants-API LLM once per assistant"""
+    from livekit.plugins import openai
+
+    return openai.LLM(assistant_id=assistant_id)
+
+
+@lru_cache(maxsize=2)
+def get_noise_cancellation(is_phone_call: bool):
+    """
+    Load the BVC noise cancellation model once per call type
+
+    Raises ImportError when the BVC plugin is not installed.
+    """
+    from livekit.plugins.bvc import BVC, BVCTelephony
+
+    return BVCTelephony() if is_phone_call else BVC()
+
+
+def prewarm(proc):
+    """
+    WorkerOptions.prewarm_fnc: load both VAD variants before any job arrives
+
+    The job process keeps the lru_cache, so entrypoints get a warm model.
+    """
+    from config import config
+
+    get_vad(config.vad_min_speech_duration, config.vad_min_silence_duration)
+    get_vad(config.vad_min_speech_duration, config.vad_min_silence_duration_phone)
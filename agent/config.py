@@ -3,6 +3,7 @@ Configuration settings for ClaudeVoice Agent
 """
 
 import os
+from types import MappingProxyType
 from typing import Optional, Dict, Any
 from enum import Enum
 
@@ -24,112 +25,133 @@ class OpenAISTTModel(Enum):
     """Available OpenAI STT models"""
     WHISPER_1 = "whisper-1"  # Current Whisper model
 
+# Room-name prefix the SIP webhook gives telephony rooms
+CALL_ROOM_PREFIX = "call-"
+
+# Read-only voice descriptions, shared by get_tts_voice_info and startup logging
+VOICE_DESCRIPTIONS = MappingProxyType({
+    OpenAIVoice.ALLOY.value: "Neutral and balanced voice",
+    OpenAIVoice.ECHO.value: "Warm and engaging voice",
+    OpenAIVoice.FABLE.value: "Expressive and dynamic voice",
+    OpenAIVoice.ONYX.value: "Deep and authoritative voice",
+    OpenAIVoice.NOVA.value: "Friendly and conversational voice",
+    OpenAIVoice.SHIMMER.value: "Soft and pleasant voice",
+})
+
+_TRUTHY = frozenset({"true", "1", "yes", "on", "t", "y"})
+
+
+def _bool_env(env, key: str, default: bool = False) -> bool:
+    """Read a feature flag; unset variables keep the default"""
+    value = env.get(key)
+    return default if value is None else value.strip().lower() in _TRUTHY
+
+
 class Config:
     """Central configuration for ClaudeVoice Agent"""
 
+    # (environment variable, attribute) pairs checked by validate()
+    _REQUIRED = (
+        ("LIVEKIT_URL", "livekit_url"),
+        ("LIVEKIT_API_KEY", "livekit_api_key"),
+        ("LIVEKIT_API_SECRET", "livekit_api_secret"),
+        ("OPENAI_API_KEY", "openai_api_key"),
+        ("COURTRESERVE_API_KEY", "courtreserve_api_key"),
+    )
+
     def __init__(self):
         # Load from environment with defaults
         self.load_from_env()
 
-    def load_from_env(self):
-        """Load configuration from environment variables"""
-
+    # (attribute, environment keys in priority order, caster, default)
+    _ENV_SPEC = (
         # LiveKit Configuration (support both naming conventions)
-        self.livekit_url = os.getenv("LIVEKIT_URL") or os.getenv("LK_URL", "")
-        self.livekit_api_key = os.getenv("LIVEKIT_API_KEY") or os.getenv("LK_API_KEY", "")
-        self.livekit_api_secret = os.getenv("LIVEKIT_API_SECRET") or os.getenv("LK_API_SECRET", "")
+        ("livekit_url", ("LIVEKIT_URL", "LK_URL"), str, ""),
+        ("livekit_api_key", ("LIVEKIT_API_KEY", "LK_API_KEY"), str, ""),
+        ("livekit_api_secret", ("LIVEKIT_API_SECRET", "LK_API_SECRET"), str, ""),
 
         # OpenAI Configuration
-        self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
-        self.openai_assistant_id = os.getenv("OPENAI_ASSISTANT_ID", "")  # <-- ADDED THIS
+        ("openai_api_key", ("OPENAI_API_KEY",), str, ""),
+        ("openai_assistant_id", ("OPENAI_ASSISTANT_ID",), str, ""),  # empty: main_fixed uses LLM_MODEL
 
         # CourtReserve API Configuration
-        self.courtreserve_api_key = os.getenv("COURTRESERVE_API_KEY", "")
-        self.courtreserve_base_url = os.getenv("COURTRESERVE_BASE_URL", "https://api.courtreserve.com")
-        self.courtreserve_org_id = os.getenv("COURTRESERVE_ORG_ID", "11710")
+        ("courtreserve_api_key", ("COURTRESERVE_API_KEY",), str, ""),
+        ("courtreserve_base_url", ("COURTRESERVE_BASE_URL",), str, "https://api.courtreserve.com"),
+        ("courtreserve_org_id", ("COURTRESERVE_ORG_ID",), str, "11710"),
 
         # Model Settings
-        self.llm_model = os.getenv("LLM_MODEL", "gpt-4-turbo")
-        self.llm_temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
-        self.llm_max_tokens = int(os.getenv("LLM_MAX_TOKENS", "150"))
+        ("llm_model", ("LLM_MODEL",), str, "gpt-4-turbo"),
+        ("llm_temperature", ("LLM_TEMPERATURE",), float, 0.7),
+        ("llm_max_tokens", ("LLM_MAX_TOKENS",), int, 150),
 
         # STT Settings
-        self.stt_model = os.getenv("STT_MODEL", OpenAISTTModel.WHISPER_1.value)
-        self.stt_language = os.getenv("STT_LANGUAGE", "en")  # None for auto-detect
+        ("stt_model", ("STT_MODEL",), str, OpenAISTTModel.WHISPER_1.value),
+        ("stt_language", ("STT_LANGUAGE",), str, "en"),  # "auto" for auto-detect
+        ("stt_provider", ("STT_PROVIDER",), str, "openai"),  # "openai" or "deepgram"
+        ("deepgram_model", ("DEEPGRAM_MODEL",), str, "nova-2"),
 
         # TTS Settings
-        self.tts_model = os.getenv("TTS_MODEL", OpenAITTSModel.TTS_1.value)
-        self.tts_voice = os.getenv("TTS_VOICE", OpenAIVoice.ALLOY.value)
-        self.tts_speed = float(os.getenv("TTS_SPEED", "1.0"))
+        ("tts_model", ("TTS_MODEL",), str, OpenAITTSModel.TTS_1.value),
+        ("tts_voice", ("TTS_VOICE",), str, OpenAIVoice.ALLOY.value),
+        ("tts_speed", ("TTS_SPEED",), float, 1.0),
 
         # Agent Settings
-        self.agent_name = os.getenv("AGENT_NAME", "claudevoice-agent")
-        self.agent_port = int(os.getenv("AGENT_PORT", "8080"))
+        ("agent_name", ("AGENT_NAME",), str, "claudevoice-agent"),
+        ("agent_port", ("AGENT_PORT",), int, 8080),
+        ("pre_greeting_delay", ("PRE_GREETING_DELAY",), float, 0.2),  # seconds, 0 disables
 
         # VAD Settings
-        self.vad_min_speech_duration = float(os.getenv("VAD_MIN_SPEECH", "0.1"))
-        self.vad_min_silence_duration = float(os.getenv("VAD_MIN_SILENCE", "0.5"))
-        self.vad_min_silence_duration_phone = float(os.getenv("VAD_MIN_SILENCE_PHONE", "0.3"))
+        ("vad_min_speech_duration", ("VAD_MIN_SPEECH",), float, 0.1),
+        ("vad_min_silence_duration", ("VAD_MIN_SILENCE",), float, 0.5),
+        ("vad_min_silence_duration_phone", ("VAD_MIN_SILENCE_PHONE",), float, 0.3),
 
         # Database Settings
-        self.db_type = os.getenv("DB_TYPE", "demo")
-        self.db_host = os.getenv("DB_HOST", "localhost")
-        self.db_port = int(os.getenv("DB_PORT", "5432") if os.getenv("DB_PORT") else 5432)
-        self.db_user = os.getenv("DB_USER", "")
-        self.db_password = os.getenv("DB_PASSWORD", "")
-        self.db_name = os.getenv("DB_NAME", "claudevoice")
+        ("db_type", ("DB_TYPE",), str, "demo"),
+        ("db_host", ("DB_HOST",), str, "localhost"),
+        ("db_port", ("DB_PORT",), int, 5432),
+        ("db_user", ("DB_USER",), str, ""),
+        ("db_password", ("DB_PASSWORD",), str, ""),
+        ("db_name", ("DB_NAME",), str, "claudevoice"),
+        ("calendar_db_path", ("CALENDAR_DB_PATH",), str, ""),  # empty keeps appointments in memory
 
         # External APIs
-        self.weather_api_key = os.getenv("OPENWEATHER_API_KEY", "")
+        ("weather_api_key", ("OPENWEATHER_API_KEY",), str, ""),
+    )
+
+    def load_from_env(self):
+        """Load configuration from environment variables"""
+        env = os.environ
+        get = env.get
+
+        # First non-empty key wins; unset or empty values fall back to the default
+        for attr, keys, cast, default in self._ENV_SPEC:
+            for key in keys:
+                value = get(key)
+                if value:
+                    setattr(self, attr, cast(value))
+                    break
+            else:
+                setattr(self, attr, default)
 
         # Feature Flags
-        self.enable_noise_cancellation = os.getenv("ENABLE_NOISE_CANCELLATION", "true").lower() == "true"
-        self.enable_voicemail_detection = os.getenv("ENABLE_VOICEMAIL_DETECTION", "true").lower() == "true"
-        self.enable_call_recording = os.getenv("ENABLE_CALL_RECORDING", "false").lower() == "true"
+        self.enable_noise_cancellation = _bool_env(env, "ENABLE_NOISE_CANCELLATION", True)
+        self.enable_voicemail_detection = _bool_env(env, "ENABLE_VOICEMAIL_DETECTION", True)
+        self.enable_call_recording = _bool_env(env, "ENABLE_CALL_RECORDING", False)
 
     def get_tts_voice_info(self) -> Dict[str, str]:
         """Get information about the current TTS voice"""
-        voice_descriptions = {
-            OpenAIVoice.ALLOY.value: "Neutral and balanced voice",
-            OpenAIVoice.ECHO.value: "Warm and engaging voice",
-            OpenAIVoice.FABLE.value: "Expressive and dynamic voice",
-            OpenAIVoice.ONYX.value: "Deep and authoritative voice",
-            OpenAIVoice.NOVA.value: "Friendly and conversational voice",
-            OpenAIVoice.SHIMMER.value: "Soft and pleasant voice"
-        }
         return {
             "voice": self.tts_voice,
-            "description": voice_descriptions.get(self.tts_voice, "Unknown voice"),
+            "description": VOICE_DESCRIPTIONS.get(self.tts_voice, "Unknown voice"),
             "model": self.tts_model,
             "speed": self.tts_speed
         }
 
     def validate(self) -> bool:
         """Validate required configuration"""
-        required = [
-            self.livekit_url,
-            self.livekit_api_key,
-            self.livekit_api_secret,
-            self.openai_api_key,
-            self.courtreserve_api_key,
-            self.openai_assistant_id  # <-- ADDED THIS
-        ]
-
-        if not all(required):
-            missing = []
-            if not self.livekit_url:
-                missing.append("LIVEKIT_URL")
-            if not self.livekit_api_key:
-                missing.append("LIVEKIT_API_KEY")
-            if not self.livekit_api_secret:
-                missing.append("LIVEKIT_API_SECRET")
-            if not self.openai_api_key:
-                missing.append("OPENAI_API_KEY")
-            if not self.courtreserve_api_key:
-                missing.append("COURTRESERVE_API_KEY")
-            if not self.openai_assistant_id:  # <-- ADDED THIS
-                missing.append("OPENAI_ASSISTANT_ID")
-
+        # Short-circuit on the happy path; only list what's missing on failure
+        if not all(getattr(self, attr) for _, attr in self._REQUIRED):
+            missing = [env for env, attr in self._REQUIRED if not getattr(self, attr)]
             raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
 
         return True
@@ -144,5 +166,9 @@ class Config:
         )
 
 
-# Global config instance
-config = Config()
\ No newline at end of file
+def __getattr__(name: str):
+    """Build the global config instance on first access (PEP 562)"""
+    if name == "config":
+        instance = globals()["config"] = Config()
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -19,59 +19,83 @@ from livekit.agents import (
     JobRequest
 )
 from livekit.agents.pipeline import VoicePipelineAgent
-from livekit.plugins import openai, silero
 from livekit.agents.voice_assistant import AssistantCallContext
 
+# Per-process cached pipeline components
+from components import get_noise_cancellation, get_tts, get_vad, prewarm, stt_from_config
+from config import CALL_ROOM_PREFIX
+
 # Import custom tools
 from tools.weather import weather_tool
-from tools.calendar import calendar_tool, check_availability
-from tools.database import database_query
+from tools.calendar import calendar_tool, check_availability, close_calendar_db
+from tools.database import close_database, database_query
 from tools.voicemail import detect_voicemail
-
-# Import configuration
-from config import config
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from tools.http_client import aclose as close_http_client
+
+# orjson parses the telephony metadata faster when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Configure logging unless the host process already has
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
-class ClaudeVoiceAgent:
-    """Main voice agent class with tool-calling capabilities"""
-
-    def __init__(self):
-        self.agent_name = config.agent_name
-        self.is_telephony = False
-        self.call_metadata = {}
-        self.config = config
-
-    def get_system_instructions(self, is_phone_call: bool = False) -> str:
-        """Get system instructions based on context"""
-        base_instructions = """You are Claude, a helpful and professional voice assistant.
+# System instructions are static, so build both variants once at import
+_SYS_BASE = """You are Claude, a helpful and professional voice assistant.
         Keep responses concise, natural, and friendly.
         Do not use special formatting, markdown, or emojis in responses.
         Speak naturally as if in a phone conversation."""
 
-        if is_phone_call:
-            return base_instructions + """
+_SYS_PHONE = _SYS_BASE + """
             You are handling a phone call. Be extra clear and professional.
             If you detect a voicemail system, leave a brief message and hang up.
             Always confirm important information by repeating it back."""
 
-        return base_instructions + """
+_SYS_DESKTOP = _SYS_BASE + """
         You have access to various tools to help users:
         - Weather information
         - Calendar management
         - Database queries
         - General assistance"""
 
+# Opening lines never vary per call
+_GREETING_PHONE = (
+    "Hello, this is Claude, your AI assistant. "
+    "How may I help you today?"
+)
+_GREETING_DESKTOP = (
+    "Hi! I'm Claude, your voice assistant. "
+    "I can help you check the weather, manage your calendar, "
+    "or answer questions. What can I do for you?"
+)
+
+class ClaudeVoiceAgent:
+    """Main voice agent class with tool-calling capabilities"""
+
+    def __init__(self):
+        from config import config
+
+        self.agent_name = config.agent_name
+        self.is_telephony = False
+        self.call_metadata = {}
+        self.config = config
+
+    @staticmethod
+    def get_system_instructions(is_phone_call: bool = False) -> str:
+        """Get system instructions based on context"""
+        return _SYS_PHONE if is_phone_call else _SYS_DESKTOP
+
     async def handle_tool_calls(self, assistant: VoicePipelineAgent, tool_calls):
         """Process and execute tool calls from the LLM"""
         try:
             for tool_call in tool_calls:
-                logger.info(f"Executing tool: {tool_call.name}")
+                logger.info("Executing tool: %s", tool_call.name)
 
                 if tool_call.name == "detect_voicemail":
                     is_voicemail = await detect_voicemail(assistant)
@@ -84,20 +108,22 @@ class ClaudeVoiceAgent:
                         return True
 
         except Exception as e:
-            logger.error(f"Tool execution error: {e}")
+            logger.error("Tool execution error: %s", e)
             await assistant.say("I encountered an issue. Let me try a different approach.")
 
         return False
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the voice agent"""
-    logger.info(f"Agent starting for room: {ctx.room.name}")
+    from config import config
+
+    logger.info("Agent starting for room: %s", ctx.room.name)
 
     # Initialize agent instance
     agent = ClaudeVoiceAgent()
 
     # Check if this is a phone call
-    is_phone_call = ctx.room.name.startswith("call-")
+    is_phone_call = ctx.room.name.startswith(CALL_ROOM_PREFIX)
     if is_phone_call:
         agent.is_telephony = True
         logger.info("Handling telephony call")
@@ -105,11 +131,10 @@ async def entrypoint(ctx: JobContext):
     # Parse room metadata if available
     if ctx.room.metadata:
         try:
-            import json
-            agent.call_metadata = json.loads(ctx.room.metadata)
-            logger.info(f"Call metadata: {agent.call_metadata}")
-        except:
-            pass
+            agent.call_metadata = _json_loads(ctx.room.metadata)
+            logger.info("Call metadata: %s", agent.call_metadata)
+        except (ValueError, TypeError):
+            logger.warning("Ignoring malformed room metadata")
 
     # Set up system instructions
     initial_ctx = llm.ChatContext().append(
@@ -120,6 +145,10 @@ async def entrypoint(ctx: JobContext):
     # Connect to room with audio-only subscription for phone calls
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
 
+    # Set when the room goes away so the entrypoint can return and clean up
+    disconnected = asyncio.Event()
+    ctx.room.on("disconnected", lambda *_: disconnected.set())
+
     logger.info("Connected to room, initializing voice pipeline")
 
     # Configure noise cancellation based on call type (if available)
@@ -128,33 +157,30 @@ async def entrypoint(ctx: JobContext):
     noise_cancellation = None
     if config.enable_noise_cancellation:
         try:
-            from livekit.plugins.bvc import BVCTelephony, BVC
-            noise_cancellation = BVCTelephony() if is_phone_call else BVC()
+            noise_cancellation = get_noise_cancellation(is_phone_call)
             logger.info("Noise cancellation enabled")
         except ImportError:
             logger.warning("BVC noise cancellation plugin not available - proceeding without it")
 
+    # Plugin imports pull in model runtimes, so defer them until a job arrives
+    from livekit.plugins import openai
+
+    # Resolve VAD timings once; they also key the cached VAD model
+    speech = config.vad_min_speech_duration
+    silence = config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
+
     # Create voice pipeline agent with optimized settings
     try:
         assistant = VoicePipelineAgent(
-            vad=silero.VAD.load(
-                min_speech_duration=config.vad_min_speech_duration,
-                min_silence_duration=config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
-            ),
-            stt=openai.STT(
-                model=config.stt_model,
-                language=config.stt_language if config.stt_language != "auto" else None
-            ),
+            vad=get_vad(speech, silence),
+            stt=stt_from_config(config),
+            # Tools are registered on this LLM per job, so it is not shared
             llm=openai.LLM(
                 model=config.llm_model,
                 temperature=config.llm_temperature,
                 max_tokens=config.llm_max_tokens,
             ),
-            tts=openai.TTS(
-                model=config.tts_model,
-                voice=config.tts_voice,
-                speed=config.tts_speed
-            ),
+            tts=get_tts(config.tts_model, config.tts_voice, config.tts_speed),
             chat_ctx=initial_ctx,
             room_input_opts=RoomInputOptions(
                 noise_cancellation=noise_cancellation
@@ -164,7 +190,7 @@ async def entrypoint(ctx: JobContext):
         logger.info("Voice pipeline initialized successfully")
 
     except Exception as e:
-        logger.error(f"Failed to initialize voice pipeline: {e}")
+        logger.error("Failed to initialize voice pipeline: %s", e)
         raise
 
     # Register tool functions
@@ -190,39 +216,28 @@ async def entrypoint(ctx: JobContext):
     assistant.start(ctx.room)
     logger.info("Assistant started successfully")
 
-    # Generate appropriate greeting
-    if is_phone_call:
-        from_number = agent.call_metadata.get("from_number", "unknown")
-        greeting = (
-            "Hello, this is Claude, your AI assistant. "
-            "How may I help you today?"
-        )
-    else:
-        greeting = (
-            "Hi! I'm Claude, your voice assistant. "
-            "I can help you check the weather, manage your calendar, "
-            "or answer questions. What can I do for you?"
-        )
+    greeting = _GREETING_PHONE if is_phone_call else _GREETING_DESKTOP
 
-    await asyncio.sleep(1)  # Brief pause before greeting
+    if config.pre_greeting_delay > 0:
+        await asyncio.sleep(config.pre_greeting_delay)  # Brief pause before greeting
     await assistant.say(greeting)
 
-    # Handle conversation until room closes
-    @ctx.room.on("room_closed")
-    async def on_room_closed():
-        logger.info("Room closed, shutting down agent")
-        await assistant.aclose()
-
-    # Keep the agent running
+    # Handle conversation until the room disconnects
     try:
-        await asyncio.Event().wait()
+        await disconnected.wait()
+        logger.info("Room closed, shutting down agent")
     except asyncio.CancelledError:
         logger.info("Agent cancelled, cleaning up")
+        raise
+    finally:
         await assistant.aclose()
+        await close_http_client()
+        await close_database()
+        await close_calendar_db()
 
 async def request_fnc(ctx: JobContext):
     """Handle job requests for explicit dispatch"""
-    logger.info(f"Received job request for room: {ctx.room.name}")
+    logger.info("Received job request for room: %s", ctx.room.name)
 
     # Accept all requests - simplified for new API
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
@@ -242,31 +257,31 @@ if __name__ == "__main__":
     # Try to load the .env.local file
     if env_path.exists():
         load_dotenv(env_path)
-        logger.info(f"Loaded environment from: {env_path}")
+        logger.info("Loaded environment from: %s", env_path)
     else:
-        logger.error(f"Could not find .env.local at {env_path}")
-        logger.error(f"Please ensure .env.local exists in {parent_dir}")
+        logger.error("Could not find .env.local at %s", env_path)
+        logger.error("Please ensure .env.local exists in %s", parent_dir)
         exit(1)
 
-    # Reload configuration after loading environment variables
-    from config import Config
-    config = Config()
+    # First access builds the config, now that the environment is loaded
+    from config import config
 
     # Validate configuration
     try:
         config.validate()
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         exit(1)
 
     # Log configuration
-    logger.info(f"Configuration loaded: {config}")
+    logger.info("Configuration loaded: %s", config)
     voice_info = config.get_tts_voice_info()
-    logger.info(f"TTS Voice: {voice_info['voice']} - {voice_info['description']}")
+    logger.info("TTS Voice: %s - %s", voice_info['voice'], voice_info['description'])
 
     # Configure worker options
     worker_options = WorkerOptions(
         entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
         # request_fnc is deprecated in newer versions
         # agent_name is set differently now
         # worker_type="voice",
@@ -275,7 +290,7 @@ if __name__ == "__main__":
         # max_workers=10  # Scale up to 10 concurrent calls
     )
 
-    logger.info(f"Starting ClaudeVoice agent: {config.agent_name}")
+    logger.info("Starting ClaudeVoice agent: %s", config.agent_name)
 
     # Run the agent
     cli.run_app(worker_options)
\ No newline at end of file
@@ -5,98 +5,129 @@ Uses OpenAI Assistants API via the plugin
 
 import asyncio
 import logging
-import os
-from typing import Optional
-from datetime import datetime
 
 from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli, llm
 from livekit.agents.voice import Agent
-from livekit.plugins import openai, silero
 
-# Import configuration
-from config import config
+# Per-process cached pipeline components
+from components import get_assistant_llm, get_llm, get_tts, get_vad, prewarm, stt_from_config
+from config import CALL_ROOM_PREFIX
 
 # Import simplified (mock) tools
 from tools.tools_simple import SIMPLE_TOOLS
 
 # Import NEW real API tools
 from tools.courtreserve_tools import get_ipc_event_list
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from tools.http_client import aclose as close_http_client
+
+# Registration list is built once: the REAL API tool first, then the simple
+# tools minus the mock calendar ones
+TOOLS_TO_REGISTER = [("get_ipc_event_list", get_ipc_event_list)] + [
+    (tool_name, tool_func)
+    for tool_name, tool_func in SIMPLE_TOOLS.items()
+    if "calendar" not in tool_name and "appointment" not in tool_name
+]
+_TOOL_NAMES = ", ".join(tool_name for tool_name, _ in TOOLS_TO_REGISTER)
+
+# Configure logging unless the host process already has
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
 
+# Prompt for the classic chat-completions path; an Assistant carries its own
+CLASSIC_INSTRUCTIONS = """You are ACE, the voice assistant for the Indianapolis Pickleball Club.
+Keep responses concise, natural, and friendly.
+Do not use special formatting, markdown, or emojis in responses."""
+
+# Opening lines never vary per call
+_GREETING_PHONE = "Hello! This is ACE from the Indianapolis Pickleball Club. How can I help you today?"
+_GREETING_DESKTOP = "Hello! I'm ACE, your voice assistant for the Indianapolis Pickleball Club. How can I help?"
+
+
+def build_agent(is_phone_call: bool, use_assistant: bool = True) -> Agent:
+    """
+    Build the voice agent shared by the Assistants-API and classic LLM paths
+
+    Args:
+        is_phone_call: Whether the room is a telephony call
+        use_assistant: Drive the conversation with the configured OpenAI
+            Assistant instead of a plain chat-completions model
+
+    Returns:
+        Configured Agent, not yet started
+    """
+    from config import config
+
+    # Plugins are cached per process; tools go on the Agent, so sharing is safe
+    if use_assistant:
+        # The OpenAI Assistant's "Instructions" field handles the system prompt
+        agent_llm = get_assistant_llm(config.openai_assistant_id)
+        initial_ctx = None
+    else:
+        agent_llm = get_llm(config.llm_model, config.llm_temperature, config.llm_max_tokens)
+        initial_ctx = llm.ChatContext().append(role="system", text=CLASSIC_INSTRUCTIONS)
+
+    # Resolve VAD timings once; they also key the cached VAD model
+    speech = config.vad_min_speech_duration
+    silence = config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
+
+    return Agent(
+        vad=get_vad(speech, silence),
+        stt=stt_from_config(config),
+        llm=agent_llm,
+        tts=get_tts(config.tts_model, config.tts_voice, config.tts_speed),
+        initial_ctx=initial_ctx,
+        max_function_calls=5
+    )
+
+
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the voice agent"""
-    logger.info(f"Agent starting for room: {ctx.room.name}")
+    from config import config
+
+    logger.info("Agent starting for room: %s", ctx.room.name)
 
-    is_phone_call = ctx.room.name.startswith("call-")
+    is_phone_call = ctx.room.name.startswith(CALL_ROOM_PREFIX)
     if is_phone_call:
         logger.info("Handling telephony call")
 
-    # --- System Prompt is NO LONGER NEEDED HERE ---
-    # The OpenAI Assistant's "Instructions" field now handles this.
-    # We pass None to the agent's initial_ctx.
-
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
     logger.info("Connected to room")
 
+    # Set when the room goes away so the entrypoint can return and clean up
+    disconnected = asyncio.Event()
+    ctx.room.on("disconnected", lambda *_: disconnected.set())
+
     try:
-        agent = Agent(
-            vad=silero.VAD.load(
-                min_speech_duration=config.vad_min_speech_duration,
-                min_silence_duration=config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
-            ),
-            stt=openai.STT(
-                model=config.stt_model,
-                language=config.stt_language if config.stt_language != "auto" else None
-            ),
-            llm=openai.LLM(
-                assistant_id=config.openai_assistant_id  # <-- THIS IS THE KEY CHANGE
-            ),
-            tts=openai.TTS(
-                model=config.tts_model,
-                voice=config.tts_voice,
-                speed=config.tts_speed
-            ),
-            initial_ctx=None,  # <-- Assistant handles the prompt
-            max_function_calls=5
-        )
+        # Fall back to the classic LLM when no Assistant is configured
+        use_assistant = bool(config.openai_assistant_id)
+        agent = build_agent(is_phone_call, use_assistant=use_assistant)
 
-        logger.info(f"Voice agent initialized with Assistant ID: {config.openai_assistant_id}")
+        if use_assistant:
+            logger.info("Voice agent initialized with Assistant ID: %s", config.openai_assistant_id)
+        else:
+            logger.info("Voice agent initialized with model: %s", config.llm_model)
 
         # --- TOOL REGISTRATION ---
-        # This remains the same. The LLM plugin is smart enough
-        # to match these functions to the ones defined in your
-        # OpenAI Assistant dashboard.
-
-        tools_registered = 0
-
-        # 1. Register the REAL API tool
-        try:
-            agent.add_function("get_ipc_event_list", get_ipc_event_list)
-            tools_registered += 1
-            logger.info("Registered REAL tool: get_ipc_event_list")
-        except Exception as e:
-            logger.warning(f"Could not register REAL tool get_ipc_event_list: {e}")
-
-        # 2. Register the other SIMPLE_TOOLS
-        for tool_name, tool_func in SIMPLE_TOOLS.items():
-            if "calendar" in tool_name or "appointment" in tool_name:
-                continue
-
+        # The LLM plugin is smart enough to match these functions to
+        # the ones defined in your OpenAI Assistant dashboard.
+        failed = []
+        for tool_name, tool_func in TOOLS_TO_REGISTER:
             try:
                 agent.add_function(tool_name, tool_func)
-                tools_registered += 1
-                logger.info(f"Registered simple tool: {tool_name}")
             except Exception as e:
-                logger.warning(f"Could not register simple tool {tool_name}: {e}")
-
-        logger.info(f"Successfully registered {tools_registered} total tools")
+                failed.append(f"{tool_name} ({e})")
+        if failed:
+            logger.warning(
+                "Registered %d of %d tools; could not register: %s",
+                len(TOOLS_TO_REGISTER) - len(failed), len(TOOLS_TO_REGISTER), ", ".join(failed)
+            )
+        else:
+            logger.info("Registered %d tools: %s", len(TOOLS_TO_REGISTER), _TOOL_NAMES)
         # ---------------------------------
 
         agent.start(ctx.room)
@@ -104,11 +135,10 @@ async def entrypoint(ctx: JobContext):
 
         # The greeting is still good to have, as the Assistant
         # won't speak until the user speaks first.
-        greeting = "Hello! This is ACE from the Indianapolis Pickleball Club. How can I help you today?"
-        if not is_phone_call:
-             greeting = "Hello! I'm ACE, your voice assistant for the Indianapolis Pickleball Club. How can I help?"
+        greeting = _GREETING_PHONE if is_phone_call else _GREETING_DESKTOP
 
-        await asyncio.sleep(1)
+        if config.pre_greeting_delay > 0:
+            await asyncio.sleep(config.pre_greeting_delay)
         # We set add_to_history=False because the Assistant API
         # will get this from the STT stream anyway.
         await agent.say(greeting, add_to_history=False)
@@ -116,21 +146,24 @@ async def entrypoint(ctx: JobContext):
         logger.info("Agent is ready and listening")
 
     except Exception as e:
-        logger.error(f"Error initializing agent: {e}")
+        logger.error("Error initializing agent: %s", e)
         raise
 
-    # Keep the agent running
+    # Keep the agent running until the room disconnects
     try:
-        await asyncio.Event().wait()
+        await disconnected.wait()
+        logger.info("Room closed, shutting down agent")
     except asyncio.CancelledError:
         logger.info("Agent cancelled, cleaning up")
+        raise
+    finally:
         await agent.close()
+        await close_http_client()
 
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
     from pathlib import Path
-    import os
 
     current_file = Path(__file__).resolve()
     parent_dir = current_file.parent.parent
@@ -138,38 +171,33 @@ if __name__ == "__main__":
 
     if env_path.exists():
         load_dotenv(env_path)
-        logger.info(f"Loaded environment from: {env_path}")
+        logger.info("Loaded environment from: %s", env_path)
     else:
-        logger.error(f"Could not find .env.local at {env_path}")
-        logger.error(f"Please ensure .env.local exists in {parent_dir}")
+        logger.error("Could not find .env.local at %s", env_path)
+        logger.error("Please ensure .env.local exists in %s", parent_dir)
         exit(1)
 
-    from config import Config
-    config = Config()
+    from config import config, VOICE_DESCRIPTIONS
 
     try:
-        config.validate()  # This will now check for all keys
+        config.validate()
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         logger.error("Please check your .env.local file")
         exit(1)
 
-    logger.info(f"Configuration loaded: Config(agent_name={config.agent_name}, assistant_id={config.openai_assistant_id})")
+    logger.info(
+        "Configuration loaded: Config(agent_name=%s, assistant_id=%s)",
+        config.agent_name, config.openai_assistant_id or "none, using " + config.llm_model
+    )
 
-    voice_descriptions = {
-        "alloy": "Neutral and balanced voice",
-        "echo": "Warm and engaging voice",
-        "fable": "Expressive and dynamic voice",
-        "onyx": "Deep and authoritative voice",
-        "nova": "Friendly and conversational voice",
-        "shimmer": "Soft and pleasant voice"
-    }
-    logger.info(f"TTS Voice: {config.tts_voice} - {voice_descriptions.get(config.tts_voice, 'Custom voice')}")
+    logger.info("TTS Voice: %s - %s", config.tts_voice, VOICE_DESCRIPTIONS.get(config.tts_voice, 'Custom voice'))
 
-    logger.info(f"Starting ClaudeVoice agent: {config.agent_name}")
+    logger.info("Starting ClaudeVoice agent: %s", config.agent_name)
 
     cli.run_app(
         WorkerOptions(
-            entrypoint_fnc=entrypoint
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm
         )
     )
\ No newline at end of file
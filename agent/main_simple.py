@@ -11,25 +11,39 @@ from datetime import datetime
 
 from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli, llm
 from livekit.agents.voice import Agent
-from livekit.plugins import openai, silero
+from livekit.plugins import openai
 
-# Import configuration
-from config import config
+from components import get_vad, prewarm, stt_from_config
+from config import CALL_ROOM_PREFIX
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Tools are imported with the module so failures surface at worker startup
+from tools.weather import weather_tool
+from tools.calendar import calendar_tool, check_availability, close_calendar_db
+from tools.database import close_database, database_query
+
+# Configure logging unless the host process already has
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
+# Opening lines never vary per call
+_GREETING_PHONE = "Hello, this is Claude, your AI assistant. How may I help you?"
+_GREETING_DESKTOP = "Hello! I'm Claude, your AI assistant. How can I help you today?"
+
+_TOOLS = (weather_tool, calendar_tool, check_availability, database_query)
+
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the voice agent"""
-    logger.info(f"Agent starting for room: {ctx.room.name}")
+    from config import config
+
+    logger.info("Agent starting for room: %s", ctx.room.name)
 
     # Check if this is a phone call
-    is_phone_call = ctx.room.name.startswith("call-")
+    is_phone_call = ctx.room.name.startswith(CALL_ROOM_PREFIX)
     if is_phone_call:
         logger.info("Handling telephony call")
 
@@ -43,21 +57,26 @@ async def entrypoint(ctx: JobContext):
         You have access to tools to help with weather, calendar, and database queries."""
     )
 
-    # Connect to room
-    await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+    # Resolve VAD timings once; they also key the VAD loaded in prewarm
+    speech = config.vad_min_speech_duration
+    silence = config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
+
+    # Connect while the VAD loads off the loop (a cache hit once prewarm ran)
+    _, vad = await asyncio.gather(
+        ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY),
+        asyncio.to_thread(get_vad, speech, silence),
+    )
     logger.info("Connected to room")
 
+    # Set when the room goes away so the entrypoint can return and clean up
+    disconnected = asyncio.Event()
+    ctx.room.on("disconnected", lambda *_: disconnected.set())
+
     # Create voice agent with OpenAI services
     try:
         agent = Agent(
-            vad=silero.VAD.load(
-                min_speech_duration=config.vad_min_speech_duration,
-                min_silence_duration=config.vad_min_silence_duration_phone if is_phone_call else config.vad_min_silence_duration
-            ),
-            stt=openai.STT(
-                model=config.stt_model,
-                language=config.stt_language if config.stt_language != "auto" else None
-            ),
+            vad=vad,
+            stt=stt_from_config(config),
             llm=openai.LLM(
                 model=config.llm_model,
                 temperature=config.llm_temperature
@@ -73,43 +92,36 @@ async def entrypoint(ctx: JobContext):
 
         logger.info("Voice agent initialized successfully")
 
-        # Import and register tools
-        try:
-            from tools.weather import weather_tool
-            from tools.calendar import calendar_tool, check_availability
-            from tools.database import database_query
-
-            agent.add_function(weather_tool)
-            agent.add_function(calendar_tool)
-            agent.add_function(check_availability)
-            agent.add_function(database_query)
-
-            logger.info("Tools registered successfully")
-        except Exception as e:
-            logger.warning(f"Some tools could not be loaded: {e}")
+        # Register tools
+        for tool in _TOOLS:
+            agent.add_function(tool)
+        logger.info("Tools registered successfully")
 
         # Start the agent
         agent.start(ctx.room)
         logger.info("Agent started")
 
-        # Generate greeting
-        greeting = "Hello! I'm Claude, your AI assistant. How can I help you today?"
-        if is_phone_call:
-            greeting = "Hello, this is Claude, your AI assistant. How may I help you?"
+        greeting = _GREETING_PHONE if is_phone_call else _GREETING_DESKTOP
 
-        await asyncio.sleep(1)  # Brief pause before greeting
+        if config.pre_greeting_delay > 0:
+            await asyncio.sleep(config.pre_greeting_delay)  # Brief pause before greeting
         await agent.say(greeting, add_to_history=True)
 
     except Exception as e:
-        logger.error(f"Failed to initialize agent: {e}")
+        logger.error("Failed to initialize agent: %s", e)
         raise
 
-    # Keep the agent running
+    # Keep the agent running until the room disconnects
     try:
-        await asyncio.Event().wait()
+        await disconnected.wait()
+        logger.info("Room closed, shutting down agent")
     except asyncio.CancelledError:
         logger.info("Agent cancelled, cleaning up")
+        raise
+    finally:
         await agent.close()
+        await close_database()
+        await close_calendar_db()
 
 
 if __name__ == "__main__":
@@ -126,34 +138,34 @@ if __name__ == "__main__":
     # Try to load the .env.local file
     if env_path.exists():
         load_dotenv(env_path)
-        logger.info(f"Loaded environment from: {env_path}")
+        logger.info("Loaded environment from: %s", env_path)
     else:
-        logger.error(f"Could not find .env.local at {env_path}")
-        logger.error(f"Please ensure .env.local exists in {parent_dir}")
+        logger.error("Could not find .env.local at %s", env_path)
+        logger.error("Please ensure .env.local exists in %s", parent_dir)
         exit(1)
 
-    # Reload configuration after loading environment variables
-    from config import Config
-    config = Config()
+    # First access builds the config, now that the environment is loaded
+    from config import config
 
     # Validate configuration
     try:
         config.validate()
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         exit(1)
 
     # Log configuration
-    logger.info(f"Configuration loaded: {config}")
+    logger.info("Configuration loaded: %s", config)
     voice_info = config.get_tts_voice_info()
-    logger.info(f"TTS Voice: {voice_info['voice']} - {voice_info['description']}")
+    logger.info("TTS Voice: %s - %s", voice_info['voice'], voice_info['description'])
 
     # Configure worker options (simplified for new API)
     worker_options = WorkerOptions(
-        entrypoint_fnc=entrypoint
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm
     )
 
-    logger.info(f"Starting ClaudeVoice agent: {config.agent_name}")
+    logger.info("Starting ClaudeVoice agent: %s", config.agent_name)
 
     # Run the agent
     cli.run_app(worker_options)
\ No newline at end of file
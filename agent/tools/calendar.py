@@ -3,18 +3,293 @@ Calendar Tool Implementation
 Manages calendar appointments and scheduling
 """
 
-import os
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+import secrets
+from datetime import date as date_type, datetime, time as time_type, timedelta
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import lru_cache
+from itertools import count
+from typing import Iterator, Optional, List, Dict, Set, Tuple
 from livekit.agents import llm
 import httpx
 import json
 
 logger = logging.getLogger(__name__)
 
+# Business hours used when suggesting free slots
+BUSINESS_START_TIME = time_type(9, 0)
+BUSINESS_END_TIME = time_type(17, 0)
+BUSINESS_START_LABEL = BUSINESS_START_TIME.strftime("%I:%M %p")
+BUSINESS_END_LABEL = BUSINESS_END_TIME.strftime("%I:%M %p")
+
+
+def _schedule_fields(start: datetime, duration_minutes: int) -> Dict:
+    """
+    Time-derived appointment fields, refreshed whenever an appointment moves
+
+    The parsed and pre-formatted copies spare readers fromisoformat and
+    strftime calls; "datetime" stays the serialized form.
+    """
+    end = start + timedelta(minutes=duration_minutes)
+    return {
+        "datetime": start.isoformat(),
+        "datetime_obj": start,
+        "end_obj": end,
+        "fmt_date_time": start.strftime("%B %d at %I:%M %p"),
+        "fmt_time_only": start.strftime("%I:%M %p"),
+        "fmt_end_time": end.strftime("%I:%M %p"),
+    }
+
+
+# Relative day names accepted wherever a YYYY-MM-DD date is
+_RELATIVE_DAYS = {"today": 0, "tomorrow": 1}
+
+
+@lru_cache(maxsize=256)
+def _parse_ymd(value: str) -> date_type:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+@lru_cache(maxsize=256)
+def _parse_hm(value: str) -> time_type:
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def _parse_date(value: str) -> date_type:
+    """Resolve "today", "tomorrow" or a YYYY-MM-DD string to a date"""
+    offset = _RELATIVE_DAYS.get(value.lower())
+    if offset is not None:
+        return (datetime.now() + timedelta(days=offset)).date()
+    return _parse_ymd(value)
+
+
+class CalendarStore(dict):
+    """
+    Appointment dict keyed by id that also indexes ids by calendar date,
+    by lowercased title word and by start time (kept sorted for bisect)
+
+    Only item assignment, deletion, pop() and clear() keep the indexes in
+    sync; re-assign an appointment after changing its datetime fields.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.by_date: Dict[date_type, List[str]] = {}
+        # Start, title and span each id was indexed under; appointments are mutated in place
+        self._indexed: Dict[str, Tuple[datetime, str, timedelta]] = {}
+        self._words: Dict[str, Set[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._starts: List[Tuple[datetime, int, str]] = []
+        self._seq = count()
+        # Multiset of appointment lengths; its max bounds how far back overlaps can start
+        self._spans: Counter = Counter()
+
+    def __setitem__(self, apt_id: str, apt: Dict):
+        self._unindex(apt_id)
+        super().__setitem__(apt_id, apt)
+        start, title_lower = apt["datetime_obj"], apt["title_lower"]
+        span = apt["end_obj"] - start
+        self._indexed[apt_id] = (start, title_lower, span)
+        self._spans[span] += 1
+        self.by_date.setdefault(start.date(), []).append(apt_id)
+        for word in title_lower.split():
+            self._words.setdefault(word, set()).add(apt_id)
+        self._order.setdefault(apt_id, next(self._seq))
+        insort(self._starts, (start, self._order[apt_id], apt_id))
+
+    def __delitem__(self, apt_id: str):
+        self._unindex(apt_id)
+        super().__delitem__(apt_id)
+        del self._order[apt_id]
+
+    def pop(self, apt_id: str, *default):
+        if apt_id in self:
+            self._unindex(apt_id)
+            del self._order[apt_id]
+        return super().pop(apt_id, *default)
+
+    def clear(self):
+        super().clear()
+        self.by_date.clear()
+        self._indexed.clear()
+        self._words.clear()
+        self._order.clear()
+        self._starts.clear()
+        self._spans.clear()
+
+    @property
+    def longest(self) -> timedelta:
+        """Length of the longest stored appointment"""
+        return max(self._spans, default=timedelta(0))
+
+    def on_date(self, day: date_type) -> List[Dict]:
+        """Appointments starting on the given date, in insertion order"""
+        return [self[apt_id] for apt_id in self.by_date.get(day, ())]
+
+    def starting_between(self, start: datetime, end: datetime) -> Iterator[str]:
+        """Lazily yield ids of appointments starting in [start, end), by start time"""
+        starts = self._starts
+        for i in range(bisect_left(starts, (start,)), bisect_left(starts, (end,))):
+            yield starts[i][2]
+
+    def match_title(self, query: str) -> List[str]:
+        """
+        Ids whose title contains ``query`` (case-insensitive), in insertion order
+
+        Every whitespace-separated query token must sit inside a single title
+        word, so the word index narrows candidates before the substring check.
+        """
+        query = query.lower()
+        candidates = None
+        for token in query.split():
+            ids = set()
+            for word, word_ids in self._words.items():
+                if token in word:
+                    ids |= word_ids
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = self.keys()
+        matches = [apt_id for apt_id in candidates if query in self[apt_id]["title_lower"]]
+        matches.sort(key=self._order.__getitem__)
+        return matches
+
+    def _unindex(self, apt_id: str):
+        indexed = self._indexed.pop(apt_id, None)
+        if indexed is None:
+            return
+        start, title_lower, span = indexed
+        self._spans[span] -= 1
+        if not self._spans[span]:
+            del self._spans[span]
+        ids = self.by_date[start.date()]
+        ids.remove(apt_id)
+        if not ids:
+            del self.by_date[start.date()]
+        del self._starts[bisect_left(self._starts, (start, self._order[apt_id], apt_id))]
+        for word in title_lower.split():
+            word_ids = self._words[word]
+            word_ids.discard(apt_id)
+            if not word_ids:
+                del self._words[word]
+
+
 # In-memory calendar storage (replace with database in production)
-calendar_store = {}
+calendar_store = CalendarStore()
+
+# Short unique ids: process-local counter plus a random suffix so ids from
+# earlier runs (see CALENDAR_DB_PATH) cannot collide
+_id_counter = count()
+
+# Optional SQLite write-through (Config.calendar_db_path); reads always
+# come from calendar_store
+_db = None
+_db_opened = False
+_db_lock: Optional[asyncio.Lock] = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    start TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    description TEXT,
+    location TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_start ON appointments(start);
+"""
+
+
+def _calendar_db_path() -> str:
+    # Read at first use so entrypoints have loaded .env by then
+    try:
+        from config import config
+    except ImportError:  # imported as agent.tools.calendar
+        from agent.config import config
+    return config.calendar_db_path
+
+
+async def _get_db():
+    """
+    Open the calendar database on first use and load its appointments
+
+    Every tool awaits this before reading calendar_store. Returns None
+    when CALENDAR_DB_PATH is unset, i.e. memory-only mode.
+    """
+    global _db_lock
+    if _db_opened:
+        return _db
+    if _db_lock is None:
+        _db_lock = asyncio.Lock()
+    async with _db_lock:
+        if not _db_opened:
+            await _open_db(_calendar_db_path())
+    return _db
+
+
+async def _open_db(path: str):
+    global _db, _db_opened
+    if path:
+        import aiosqlite
+
+        db = await aiosqlite.connect(path)
+        try:
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.executescript(_SCHEMA)
+            async with db.execute(
+                "SELECT id, title, start, duration_minutes, description, location, created_at "
+                "FROM appointments"
+            ) as cursor:
+                async for apt_id, title, start, duration, description, location, created_at in cursor:
+                    calendar_store[apt_id] = {
+                        "id": apt_id,
+                        "title": title,
+                        "title_lower": title.lower(),
+                        **_schedule_fields(datetime.fromisoformat(start), duration),
+                        "duration_minutes": duration,
+                        "description": description,
+                        "location": location,
+                        "created_at": created_at
+                    }
+        except BaseException:
+            # aiosqlite runs a non-daemon thread per connection; don't leak it
+            await db.close()
+            raise
+        _db = db
+        logger.info("Loaded %d appointments from %s", len(calendar_store), path)
+    _db_opened = True
+
+
+async def close_calendar_db():
+    """Close the calendar database; call from job shutdown. The next tool call reopens it"""
+    global _db, _db_opened
+    db, _db, _db_opened = _db, None, False
+    if db is not None:
+        await db.close()
+
+
+async def _save_appointment(apt: Dict):
+    db = await _get_db()
+    if db is not None:
+        await db.execute(
+            "INSERT OR REPLACE INTO appointments "
+            "(id, title, start, duration_minutes, description, location, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (apt["id"], apt["title"], apt["datetime"], apt["duration_minutes"],
+             apt["description"], apt["location"], apt["created_at"])
+        )
+        await db.commit()
+
+
+async def _delete_appointment(apt_id: str):
+    db = await _get_db()
+    if db is not None:
+        await db.execute("DELETE FROM appointments WHERE id = ?", (apt_id,))
+        await db.commit()
 
 
 @llm.ai_callable(
@@ -43,16 +318,11 @@ async def calendar_tool(
         Confirmation message
     """
     try:
-        # Parse date
-        if date.lower() == "today":
-            appointment_date = datetime.now().date()
-        elif date.lower() == "tomorrow":
-            appointment_date = (datetime.now() + timedelta(days=1)).date()
-        else:
-            appointment_date = datetime.strptime(date, "%Y-%m-%d").date()
+        await _get_db()  # loads persisted appointments on first use
 
-        # Parse time
-        appointment_time = datetime.strptime(time, "%H:%M").time()
+        # Parse date and time
+        appointment_date = _parse_date(date)
+        appointment_time = _parse_hm(time)
 
         # Combine date and time
         appointment_datetime = datetime.combine(appointment_date, appointment_time)
@@ -62,13 +332,14 @@ async def calendar_tool(
             return "I cannot create appointments in the past. Please provide a future date and time."
 
         # Create appointment ID
-        appointment_id = f"apt_{datetime.now().timestamp()}"
+        appointment_id = f"apt_{next(_id_counter):x}_{secrets.token_hex(4)}"
 
         # Store appointment
         appointment = {
             "id": appointment_id,
             "title": title,
-            "datetime": appointment_datetime.isoformat(),
+            "title_lower": title.lower(),
+            **_schedule_fields(appointment_datetime, duration_minutes),
             "duration_minutes": duration_minutes,
             "description": description,
             "location": location,
@@ -83,12 +354,17 @@ async def calendar_tool(
                 f"at {conflict['datetime']}. Would you like to schedule at a different time?"
             )
 
-        # Store in calendar
+        # Store in calendar; undo if the write-through fails
         calendar_store[appointment_id] = appointment
+        try:
+            await _save_appointment(appointment)
+        except Exception:
+            del calendar_store[appointment_id]
+            raise
 
         # Format confirmation
         formatted_date = appointment_datetime.strftime("%B %d, %Y")
-        formatted_time = appointment_datetime.strftime("%I:%M %p")
+        formatted_time = appointment["fmt_time_only"]
 
         response = (
             f"I've scheduled '{title}' for {formatted_date} at {formatted_time} "
@@ -104,14 +380,14 @@ async def calendar_tool(
         return response
 
     except ValueError as e:
-        logger.error(f"Date/time parsing error: {e}")
+        logger.error("Date/time parsing error: %s", e)
         return (
             "I couldn't understand the date or time format. "
             "Please use YYYY-MM-DD for date and HH:MM for time."
         )
 
     except Exception as e:
-        logger.error(f"Calendar creation error: {e}")
+        logger.error("Calendar creation error: %s", e)
         return "I encountered an error while creating the appointment."
 
 
@@ -133,41 +409,29 @@ async def check_availability(
         Availability information
     """
     try:
-        # Parse date
-        if date.lower() == "today":
-            check_date = datetime.now().date()
-        elif date.lower() == "tomorrow":
-            check_date = (datetime.now() + timedelta(days=1)).date()
-        else:
-            check_date = datetime.strptime(date, "%Y-%m-%d").date()
+        await _get_db()  # loads persisted appointments on first use
+
+        check_date = _parse_date(date)
 
         # Get appointments for the date
-        appointments_on_date = []
-        for apt_id, apt in calendar_store.items():
-            apt_datetime = datetime.fromisoformat(apt["datetime"])
-            if apt_datetime.date() == check_date:
-                appointments_on_date.append(apt)
+        appointments_on_date = calendar_store.on_date(check_date)
 
         # Sort by time
-        appointments_on_date.sort(key=lambda x: x["datetime"])
+        appointments_on_date.sort(key=lambda x: x["datetime_obj"])
 
         if not appointments_on_date:
             return f"You have no appointments on {check_date.strftime('%B %d, %Y')}. The entire day is available."
 
         # If specific time requested
         if time:
-            check_time = datetime.strptime(time, "%H:%M").time()
-            check_datetime = datetime.combine(check_date, check_time)
+            check_datetime = datetime.combine(check_date, _parse_hm(time))
 
             for apt in appointments_on_date:
-                apt_datetime = datetime.fromisoformat(apt["datetime"])
-                apt_end = apt_datetime + timedelta(minutes=apt["duration_minutes"])
-
-                if apt_datetime <= check_datetime < apt_end:
+                if apt["datetime_obj"] <= check_datetime < apt["end_obj"]:
                     return (
                         f"You are not available at {time}. "
                         f"You have '{apt['title']}' from "
-                        f"{apt_datetime.strftime('%I:%M %p')} to {apt_end.strftime('%I:%M %p')}."
+                        f"{apt['fmt_time_only']} to {apt['fmt_end_time']}."
                     )
 
             return f"You are available at {time} on {check_date.strftime('%B %d, %Y')}."
@@ -175,8 +439,7 @@ async def check_availability(
         # List all appointments for the day
         response = f"Your schedule for {check_date.strftime('%B %d, %Y')}:\n"
         for apt in appointments_on_date:
-            apt_datetime = datetime.fromisoformat(apt["datetime"])
-            response += f"- {apt_datetime.strftime('%I:%M %p')}: {apt['title']} ({apt['duration_minutes']} min)\n"
+            response += f"- {apt['fmt_time_only']}: {apt['title']} ({apt['duration_minutes']} min)\n"
 
         # Find available slots
         available_slots = find_available_slots(appointments_on_date, check_date)
@@ -186,7 +449,7 @@ async def check_availability(
         return response
 
     except Exception as e:
-        logger.error(f"Availability check error: {e}")
+        logger.error("Availability check error: %s", e)
         return "I encountered an error while checking availability."
 
 
@@ -206,26 +469,23 @@ async def list_appointments(
         List of upcoming appointments
     """
     try:
+        await _get_db()  # loads persisted appointments on first use
+
         now = datetime.now()
         end_date = now + timedelta(days=days_ahead)
 
-        upcoming = []
-        for apt_id, apt in calendar_store.items():
-            apt_datetime = datetime.fromisoformat(apt["datetime"])
-            if now <= apt_datetime <= end_date:
-                upcoming.append(apt)
+        # Range query on the start-sorted index; results arrive in time order
+        upcoming = [
+            calendar_store[apt_id]
+            for apt_id in calendar_store.starting_between(now, end_date + timedelta(microseconds=1))
+        ]
 
         if not upcoming:
             return f"You have no appointments in the next {days_ahead} days."
 
-        # Sort by datetime
-        upcoming.sort(key=lambda x: x["datetime"])
-
         response = f"Your upcoming appointments for the next {days_ahead} days:\n"
         for apt in upcoming:
-            apt_datetime = datetime.fromisoformat(apt["datetime"])
-            formatted_date = apt_datetime.strftime("%B %d at %I:%M %p")
-            response += f"- {formatted_date}: {apt['title']}"
+            response += f"- {apt['fmt_date_time']}: {apt['title']}"
 
             if apt.get("location"):
                 response += f" at {apt['location']}"
@@ -235,7 +495,7 @@ async def list_appointments(
         return response
 
     except Exception as e:
-        logger.error(f"List appointments error: {e}")
+        logger.error("List appointments error: %s", e)
         return "I encountered an error while listing appointments."
 
 
@@ -257,24 +517,22 @@ async def cancel_appointment(
         Confirmation or error message
     """
     try:
+        await _get_db()  # loads persisted appointments on first use
+
         # Find appointment by title (and optionally date)
-        found_appointments = []
-
-        for apt_id, apt in calendar_store.items():
-            if title.lower() in apt["title"].lower():
-                if date:
-                    apt_datetime = datetime.fromisoformat(apt["datetime"])
-                    if date.lower() == "today":
-                        check_date = datetime.now().date()
-                    elif date.lower() == "tomorrow":
-                        check_date = (datetime.now() + timedelta(days=1)).date()
-                    else:
-                        check_date = datetime.strptime(date, "%Y-%m-%d").date()
-
-                    if apt_datetime.date() == check_date:
-                        found_appointments.append((apt_id, apt))
-                else:
-                    found_appointments.append((apt_id, apt))
+        if date:
+            check_date = _parse_date(date)
+            title_lower = title.lower()
+            found_appointments = [
+                (apt_id, calendar_store[apt_id])
+                for apt_id in calendar_store.by_date.get(check_date, ())
+                if title_lower in calendar_store[apt_id]["title_lower"]
+            ]
+        else:
+            found_appointments = [
+                (apt_id, calendar_store[apt_id])
+                for apt_id in calendar_store.match_title(title)
+            ]
 
         if not found_appointments:
             return f"I couldn't find an appointment matching '{title}'."
@@ -282,23 +540,22 @@ async def cancel_appointment(
         if len(found_appointments) > 1:
             response = f"I found {len(found_appointments)} appointments matching '{title}':\n"
             for apt_id, apt in found_appointments:
-                apt_datetime = datetime.fromisoformat(apt["datetime"])
-                response += f"- {apt_datetime.strftime('%B %d at %I:%M %p')}: {apt['title']}\n"
+                response += f"- {apt['fmt_date_time']}: {apt['title']}\n"
             response += "Please be more specific about which one to cancel."
             return response
 
-        # Cancel the appointment
+        # Cancel the appointment, on disk first so a failed delete keeps it listed
         apt_id, apt = found_appointments[0]
-        del calendar_store[apt_id]
+        await _delete_appointment(apt_id)
+        calendar_store.pop(apt_id, None)
 
-        apt_datetime = datetime.fromisoformat(apt["datetime"])
         return (
             f"I've cancelled '{apt['title']}' scheduled for "
-            f"{apt_datetime.strftime('%B %d at %I:%M %p')}."
+            f"{apt['fmt_date_time']}."
         )
 
     except Exception as e:
-        logger.error(f"Cancel appointment error: {e}")
+        logger.error("Cancel appointment error: %s", e)
         return "I encountered an error while cancelling the appointment."
 
 
@@ -324,28 +581,18 @@ async def reschedule_appointment(
         Confirmation or error message
     """
     try:
-        # Find the appointment
-        found = None
-        for apt_id, apt in calendar_store.items():
-            if title.lower() in apt["title"].lower():
-                found = (apt_id, apt)
-                break
+        await _get_db()  # loads persisted appointments on first use
 
-        if not found:
+        # Find the appointment
+        matches = calendar_store.match_title(title)
+        if not matches:
             return f"I couldn't find an appointment matching '{title}'."
 
-        apt_id, apt = found
+        apt_id = matches[0]
+        apt = calendar_store[apt_id]
 
         # Parse new date and time
-        if new_date.lower() == "today":
-            new_date_obj = datetime.now().date()
-        elif new_date.lower() == "tomorrow":
-            new_date_obj = (datetime.now() + timedelta(days=1)).date()
-        else:
-            new_date_obj = datetime.strptime(new_date, "%Y-%m-%d").date()
-
-        new_time_obj = datetime.strptime(new_time, "%H:%M").time()
-        new_datetime = datetime.combine(new_date_obj, new_time_obj)
+        new_datetime = datetime.combine(_parse_date(new_date), _parse_hm(new_time))
 
         if new_datetime < datetime.now():
             return "I cannot reschedule appointments to the past."
@@ -359,20 +606,23 @@ async def reschedule_appointment(
                 f"at {conflict['datetime']}."
             )
 
-        # Update appointment
-        old_datetime = datetime.fromisoformat(apt["datetime"])
-        apt["datetime"] = new_datetime.isoformat()
-        if duration_minutes:
-            apt["duration_minutes"] = duration_minutes
+        # Update a copy so the original can be put back if the write-through fails
+        moved = {**apt, **_schedule_fields(new_datetime, duration), "duration_minutes": duration}
+        calendar_store[apt_id] = moved
+        try:
+            await _save_appointment(moved)
+        except Exception:
+            calendar_store[apt_id] = apt
+            raise
 
         return (
             f"I've rescheduled '{apt['title']}' from "
-            f"{old_datetime.strftime('%B %d at %I:%M %p')} to "
-            f"{new_datetime.strftime('%B %d at %I:%M %p')}."
+            f"{apt['fmt_date_time']} to "
+            f"{moved['fmt_date_time']}."
         )
 
     except Exception as e:
-        logger.error(f"Reschedule error: {e}")
+        logger.error("Reschedule error: %s", e)
         return "I encountered an error while rescheduling the appointment."
 
 
@@ -386,15 +636,15 @@ async def check_conflicts(
     """Check for scheduling conflicts"""
     end_time = datetime_obj + timedelta(minutes=duration_minutes)
 
-    for apt_id, apt in calendar_store.items():
+    # Only appointments starting late enough to still be running can overlap
+    earliest = datetime_obj - calendar_store.longest
+    for apt_id in calendar_store.starting_between(earliest, end_time):
         if apt_id == exclude_id:
             continue
 
-        apt_datetime = datetime.fromisoformat(apt["datetime"])
-        apt_end = apt_datetime + timedelta(minutes=apt["duration_minutes"])
-
+        apt = calendar_store[apt_id]
         # Check for overlap
-        if (datetime_obj < apt_end and end_time > apt_datetime):
+        if datetime_obj < apt["end_obj"]:
             return apt
 
     return None
@@ -403,30 +653,25 @@ async def check_conflicts(
 def find_available_slots(appointments: List[Dict], date: datetime.date) -> List[str]:
     """Find available time slots in a day"""
     slots = []
-    business_start = datetime.combine(date, datetime.strptime("09:00", "%H:%M").time())
-    business_end = datetime.combine(date, datetime.strptime("17:00", "%H:%M").time())
-
     if not appointments:
         return ["9:00 AM - 5:00 PM"]
 
+    business_start = datetime.combine(date, BUSINESS_START_TIME)
+    business_end = datetime.combine(date, BUSINESS_END_TIME)
+
     # Check slot before first appointment
-    first_apt = datetime.fromisoformat(appointments[0]["datetime"])
-    if first_apt > business_start:
-        slots.append(f"{business_start.strftime('%I:%M %p')} - {first_apt.strftime('%I:%M %p')}")
+    first_apt = appointments[0]
+    if first_apt["datetime_obj"] > business_start:
+        slots.append(f"{BUSINESS_START_LABEL} - {first_apt['fmt_time_only']}")
 
     # Check slots between appointments
-    for i in range(len(appointments) - 1):
-        current_end = datetime.fromisoformat(appointments[i]["datetime"]) + \
-                     timedelta(minutes=appointments[i]["duration_minutes"])
-        next_start = datetime.fromisoformat(appointments[i + 1]["datetime"])
-
-        if next_start > current_end:
-            slots.append(f"{current_end.strftime('%I:%M %p')} - {next_start.strftime('%I:%M %p')}")
+    for current, following in zip(appointments, appointments[1:]):
+        if following["datetime_obj"] > current["end_obj"]:
+            slots.append(f"{current['fmt_end_time']} - {following['fmt_time_only']}")
 
     # Check slot after last appointment
-    last_apt = datetime.fromisoformat(appointments[-1]["datetime"])
-    last_end = last_apt + timedelta(minutes=appointments[-1]["duration_minutes"])
-    if last_end < business_end:
-        slots.append(f"{last_end.strftime('%I:%M %p')} - {business_end.strftime('%I:%M %p')}")
+    last_apt = appointments[-1]
+    if last_apt["end_obj"] < business_end:
+        slots.append(f"{last_apt['fmt_end_time']} - {BUSINESS_END_LABEL}")
 
     return slots
\ No newline at end of file
@@ -1,17 +1,33 @@
-import httpx
 import logging
 from datetime import datetime
 from agent.config import config  # Import our central config
+from .cache import TTLCache
+from .http_client import get_client
+
+# orjson decodes large event lists several times faster when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+# Callers often re-ask about the same window within a conversation
+_event_cache = TTLCache(maxsize=128, ttl=60)
+
+
 async def get_ipc_event_list(start_date: str, end_date: str, category_id: int = None) -> str:
     """
     Fetches the event list from the CourtReserve API.
     This is the real function that OpenAI's "get_ipc_event_list" will trigger.
     """
 
-    logger.info(f"CourtReserve: Fetching events from {start_date} to {end_date}")
+    cache_key = (start_date, end_date, category_id)
+    cached = _event_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    logger.info("CourtReserve: Fetching events from %s to %s", start_date, end_date)
 
     # 1. Set up the API call
     api_url = f"{config.courtreserve_base_url}/api/v1/eventcalendar/eventlist"
@@ -33,42 +49,44 @@ async def get_ipc_event_list(start_date: str, end_date: str, category_id: int =
 
     # 4. Make the async API call
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers, params=params)
+        response = await get_client().get(api_url, headers=headers, params=params, timeout=5.0)
 
-            if response.status_code == 200:
-                data = response.json().get("Data", [])
-                if not data:
-                    return f"I checked the calendar, but I don't see any events scheduled between {start_date} and {end_date}."
+        if response.status_code == 200:
+            data = _json_loads(response.content).get("Data", [])
+            if not data:
+                response_text = f"I checked the calendar, but I don't see any events scheduled between {start_date} and {end_date}."
+                _event_cache.set(cache_key, response_text)
+                return response_text
 
-                # 5. Format the JSON into a natural language response
-                response_text = f"Here's what I found between {start_date} and {end_date}:\n"
+            # 5. Format the JSON into a natural language response
+            lines = [f"Here's what I found between {start_date} and {end_date}:"]
 
-                for event in data[:10]: # Limit to 10 to avoid huge response
-                    event_name = event.get('EventName')
-                    start_time_str = event.get('StartDateTime')
-                    start_time = datetime.fromisoformat(start_time_str).strftime('%A, %b %d at %I:%M %p')
-                    registered = event.get('RegisteredCount', 0)
-                    max_players = event.get('MaxRegistrants', 0)
+            for event in data[:10]: # Limit to 10 to avoid huge response
+                event_name = event.get('EventName')
+                start_time = datetime.fromisoformat(event.get('StartDateTime')).strftime('%A, %b %d at %I:%M %p')
+                registered = event.get('RegisteredCount', 0)
+                max_players = event.get('MaxRegistrants', 0)
 
-                    spots_info = ""
-                    if max_players > 0:
-                        spots_left = max_players - registered
-                        if spots_left > 0:
-                            spots_info = f"({spots_left} spots left)"
-                        else:
-                            spots_info = "(it's full)"
+                spots_info = ""
+                if max_players > 0:
+                    spots_left = max_players - registered
+                    if spots_left > 0:
+                        spots_info = f"({spots_left} spots left)"
+                    else:
+                        spots_info = "(it's full)"
 
-                    response_text += f"- {event_name} on {start_time} {spots_info}\n"
+                lines.append(f"- {event_name} on {start_time} {spots_info}")
 
-                if len(data) > 10:
-                    response_text += f"...and {len(data) - 10} other events."
+            # Every line, including the last event, ends with a newline
+            lines.append(f"...and {len(data) - 10} other events." if len(data) > 10 else "")
+            response_text = "\n".join(lines)
 
-                return response_text
-            else:
-                logger.error(f"CourtReserve API error: {response.status_code} - {response.text}")
-                return f"Sorry, I had trouble checking the calendar. The system returned a {response.status_code} error."
+            _event_cache.set(cache_key, response_text)
+            return response_text
+        else:
+            logger.error("CourtReserve API error: %d - %s", response.status_code, response.text)
+            return f"Sorry, I had trouble checking the calendar. The system returned a {response.status_code} error."
 
     except Exception as e:
-        logger.error(f"CourtReserve API call failed: {e}")
+        logger.error("CourtReserve API call failed: %s", e)
         return f"Sorry, I ran into an error trying to check the CourtReserve calendar: {e}"
\ No newline at end of file
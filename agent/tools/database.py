@@ -4,17 +4,38 @@ Handles database queries and data management
 """
 
 import os
+import asyncio
 import logging
 import json
-from typing import Any, Dict, List, Optional
+import functools
+import time
+from bisect import bisect_right
+from itertools import filterfalse
+from operator import is_, itemgetter
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from livekit.agents import llm
 import asyncpg
 import sqlite3
 import aiosqlite
 
+from .cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# What a live query can raise: driver errors, a lost connection, or a row
+# missing a column or holding a NULL the formatters expect
+_LIVE_QUERY_ERRORS = (
+    asyncpg.PostgresError, asyncpg.InterfaceError, sqlite3.Error, OSError, KeyError, TypeError, ValueError
+)
+
+# What formatting a stored row can raise when a field is missing or mistyped
+_ROW_ERRORS = (KeyError, TypeError, ValueError)
+
+
+def _is_optional(value: Any, kind: type) -> bool:
+    return value is None or isinstance(value, kind)
+
 # In-memory data store for demo (replace with real database)
 demo_database = {
     "customers": [
@@ -39,23 +60,267 @@ demo_database = {
 }
 
 
+# Hash indexes over demo_database, kept in sync by update_database
+_idx_by_id: Dict[str, Dict[Any, Dict]] = {}                # table -> id -> row
+_idx_by_status: Dict[str, Dict[Any, List[Dict]]] = {}      # table -> status -> rows
+_idx_name_tokens: Dict[str, Dict[str, List[Dict]]] = {}    # table -> name word -> rows
+_idx_orders_by_customer: Dict[Any, List[Dict]] = {}        # customer id -> orders
+
+# Highest id handed out per table, so inserts never rescan the table
+_NEXT_ID: Dict[str, int] = {}
+
+# Tables whose "name" column is tokenized for lookups
+_NAME_TABLES = ("customers", "products")
+
+# Lowercased copy of a row's values for search_term matching. The separator
+# cannot appear in spoken search terms, so matches never span two fields.
+_SEARCH_BLOB = "__search_blob__"
+_BLOB_SEP = "\x1f"
+
+# Per-table search corpus: every row's blob joined into one string, with the
+# offset each row starts at, so a search is a few str.find calls rather than
+# a substring test per row. Dropped whenever the table's rows change.
+_ROW_SEP = "\x1e"
+_corpus: Dict[str, Tuple[str, List[int]]] = {}
+
+# Lowercased shadow copies of the name columns lookups compare against
+_LOWER_FIELDS = {"name": "__name_lc__", "customer_name": "__customer_name_lc__"}
+
+
+def _search_blob(row: Dict) -> str:
+    return _BLOB_SEP.join(
+        str(value).lower() for key, value in row.items() if not key.startswith("__")
+    )
+
+
+def _insert_by_id(rows: List[Dict], row: Dict):
+    """Insert keeping id order, which is table order since ids only grow"""
+    i = len(rows)
+    while i and rows[i - 1].get("id", 0) > row.get("id", 0):
+        i -= 1
+    rows.insert(i, row)
+
+
+def _position(rows: List[Dict], row: Dict) -> int:
+    """Index of ``row`` in an id-ordered table, found by binary search"""
+    row_id = row.get("id", 0)
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if rows[mid].get("id", 0) < row_id:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < len(rows) and rows[lo] is row:
+        return lo
+    return next(i for i, r in enumerate(rows) if r is row)
+
+
+def _index_row(table: str, row: Dict):
+    _corpus.pop(table, None)
+    row[_SEARCH_BLOB] = _search_blob(row)
+    for field, shadow in _LOWER_FIELDS.items():
+        if field in row:
+            row[shadow] = str(row[field]).lower()
+    _idx_by_id.setdefault(table, {})[row.get("id")] = row
+    if "status" in row:
+        _insert_by_id(_idx_by_status.setdefault(table, {}).setdefault(row["status"], []), row)
+    if table in _NAME_TABLES and "name" in row:
+        tokens = _idx_name_tokens.setdefault(table, {})
+        for word in set(row["__name_lc__"].split()):
+            _insert_by_id(tokens.setdefault(word, []), row)
+    if table == "orders" and "customer_id" in row:
+        _insert_by_id(_idx_orders_by_customer.setdefault(row["customer_id"], []), row)
+
+
+def _check_index_keys(table: str, row: Dict):
+    """Raise TypeError for values _index_row would key on but cannot hash, before any write"""
+    if "status" in row:
+        hash(row["status"])
+    if table == "orders" and "customer_id" in row:
+        hash(row["customer_id"])
+
+
+def _remove_row(index: Dict, key: Any, row: Dict):
+    rows = index.get(key)
+    if rows is not None:
+        rows[:] = filterfalse(functools.partial(is_, row), rows)
+        if not rows:
+            del index[key]
+
+
+def _unindex_row(table: str, row: Dict):
+    _corpus.pop(table, None)
+    by_id = _idx_by_id.get(table, {})
+    if by_id.get(row.get("id")) is row:
+        del by_id[row.get("id")]
+    if "status" in row:
+        _remove_row(_idx_by_status.get(table, {}), row["status"], row)
+    if table in _NAME_TABLES and "name" in row:
+        tokens = _idx_name_tokens.get(table, {})
+        for word in set(row["__name_lc__"].split()):
+            _remove_row(tokens, word, row)
+    if table == "orders" and "customer_id" in row:
+        _remove_row(_idx_orders_by_customer, row["customer_id"], row)
+
+
+def _build_indexes():
+    """(Re)build every index from demo_database"""
+    for index in (_idx_by_id, _idx_by_status, _idx_name_tokens, _idx_orders_by_customer, _corpus):
+        index.clear()
+    for table, rows in demo_database.items():
+        for row in rows:
+            _index_row(table, row)
+        _NEXT_ID[table] = max(map(itemgetter("id"), rows), default=0)
+
+
+def _find_by_name(table: str, needle: str) -> Optional[Dict]:
+    """
+    First row (in table order) whose name contains ``needle``, case-insensitive
+
+    Each query word must fall inside one name word, so the token index
+    narrows the candidates before the substring check.
+    """
+    needle = needle.lower()
+    candidates = None
+    for token in needle.split():
+        found = {}
+        for word, rows in _idx_name_tokens.get(table, {}).items():
+            if token in word:
+                found.update((id(r), r) for r in rows)
+        candidates = found if candidates is None else {k: r for k, r in candidates.items() if k in found}
+        if not candidates:
+            return None
+    rows = demo_database[table] if candidates is None else candidates.values()
+    return min(
+        (r for r in rows if needle in r.get("__name_lc__", "")),
+        key=lambda r: r.get("id", 0),
+        default=None
+    )
+
+
+def _search_table(table: str, needle: str) -> List[Dict]:
+    """Rows of ``table`` (in table order) whose search blob contains ``needle``"""
+    rows = demo_database[table]
+    entry = _corpus.get(table)
+    if entry is None:
+        blobs = list(map(itemgetter(_SEARCH_BLOB), rows))
+        starts, offset = [], 0
+        for blob in blobs:
+            starts.append(offset)
+            offset += len(blob) + len(_ROW_SEP)
+        entry = _corpus[table] = (_ROW_SEP.join(blobs), starts)
+    text, starts = entry
+
+    hits = []
+    pos = text.find(needle)
+    while pos != -1:
+        i = bisect_right(starts, pos) - 1
+        hits.append(rows[i])
+        if i + 1 == len(starts):
+            break
+        # Skip the rest of this row; one hit is enough
+        pos = text.find(needle, starts[i + 1])
+    return hits
+
+
+def _indexed_candidates(table: str, filters: Dict[str, Any]) -> Optional[List[Dict]]:
+    """Rows an indexed filter column narrows the table to, or None if none applies"""
+    if "id" in filters and isinstance(filters["id"], (int, float, str)):
+        row = _idx_by_id.get(table, {}).get(filters["id"])
+        return [row] if row is not None else []
+    if table == "orders" and isinstance(filters.get("customer_id"), (int, float, str)):
+        return _idx_orders_by_customer.get(filters["customer_id"], [])
+    if isinstance(filters.get("status"), str):
+        return _idx_by_status.get(table, {}).get(filters["status"], [])
+    return None
+
+
+_MISSING = object()
+
+_build_indexes()
+
+
+# Replies to repeated demo lookups, cleared whenever update_database writes
+_reply_cache = TTLCache(maxsize=256, ttl=300.0)
+
+
+def _cached_reply(make_key):
+    """Serve repeat calls from _reply_cache, keyed by ``make_key(*args)``"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                key = (func.__name__, make_key(*args, **kwargs))
+                reply = _reply_cache.get(key)
+            except (TypeError, AttributeError):
+                # Unhashable filter values or odd argument types; skip the cache
+                return await func(*args, **kwargs)
+            if reply is None:
+                reply = await func(*args, **kwargs)
+                _reply_cache.set(key, reply)
+            return reply
+        return wrapper
+    return decorator
+
+
+# Small reference tables pulled into memory once per connection; tables
+# larger than the limit are left to live queries
+_PREFETCH_TABLES = ("customers", "products", "appointments")
+_PREFETCH_LIMIT = 1000
+
+
 class DatabaseConnection:
     """Manages database connections based on configuration"""
 
     def __init__(self):
-        self.db_type = os.getenv("DB_TYPE", "demo")  # demo, sqlite, postgresql
+        self._load_settings()
         self.connection = None
+        self._cache: Dict[str, List[Dict]] = {}
+        self._prefetched = False
+        self._connect_attempted = False
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    def _load_settings(self):
+        self.db_type = os.getenv("DB_TYPE", "demo")  # demo, sqlite, postgresql
+        self.prefetch_rows = int(os.getenv("DB_PREFETCH", "200"))  # rows per PostgreSQL cursor fetch
+
+    async def ensure_connected(self):
+        """
+        Open the configured connection on first use
+
+        Settings are re-read here rather than at import, so a DB_TYPE loaded
+        from .env.local after the tools were imported still applies. A failed
+        connect is not retried until close(); queries fall back to demo data.
+        """
+        if self._connect_attempted:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._connect_attempted:
+                return
+            self._load_settings()
+            if self.db_type in ("postgresql", "sqlite"):
+                await self.connect()
+            self._connect_attempted = True
 
     async def connect(self):
         """Establish database connection"""
+        self.invalidate()
         try:
             if self.db_type == "postgresql":
-                self.connection = await asyncpg.connect(
+                # A pool lets concurrent tool calls run in parallel; each pooled
+                # connection keeps asyncpg's prepared-statement cache, so repeated
+                # query shapes are parsed and planned once per connection
+                self.connection = await asyncpg.create_pool(
                     host=os.getenv("DB_HOST", "localhost"),
                     port=int(os.getenv("DB_PORT", "5432")),
                     user=os.getenv("DB_USER", "user"),
                     password=os.getenv("DB_PASSWORD", "password"),
-                    database=os.getenv("DB_NAME", "claudevoice")
+                    database=os.getenv("DB_NAME", "claudevoice"),
+                    min_size=2,
+                    max_size=10
                 )
             elif self.db_type == "sqlite":
                 db_path = os.getenv("DB_PATH", "claudevoice.db")
@@ -69,19 +334,106 @@ class DatabaseConnection:
             logger.error(f"Database connection error: {e}")
             self.connection = None
 
+    async def fetch(self, sql: str, *args, stream: bool = False) -> List[Dict]:
+        """
+        Run a read query and return its rows as dicts
+
+        With ``stream`` set, PostgreSQL reads through a server-side cursor
+        that pulls ``prefetch_rows`` rows per round-trip; use it for queries
+        whose result size is not bounded.
+        """
+        if self.db_type == "postgresql":
+            async with self.connection.acquire() as conn:
+                if stream:
+                    async with conn.transaction():
+                        return [
+                            dict(record)
+                            async for record in conn.cursor(sql, *args, prefetch=self.prefetch_rows)
+                        ]
+                return [dict(record) for record in await conn.fetch(sql, *args)]
+        async with self.connection.execute(sql, args) as cursor:
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+    def param(self, position: int) -> str:
+        """Placeholder for the ``position``-th (1-based) query argument"""
+        return f"${position}" if self.db_type == "postgresql" else "?"
+
+    async def execute(self, sql: str, *args) -> int:
+        """Run a write, commit it, and return the number of rows it changed"""
+        if self.db_type == "postgresql":
+            async with self.connection.acquire() as conn:
+                status = await conn.execute(sql, *args)  # e.g. "UPDATE 1"
+            return int(status.rsplit(" ", 1)[-1])
+        cursor = await self.connection.execute(sql, args)
+        await self.connection.commit()
+        return cursor.rowcount
+
+    async def insert(self, table: str, values: Dict[str, Any]) -> Any:
+        """Insert one row, commit it, and return the id the database assigned"""
+        columns = list(values)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(self.param(i) for i in range(1, len(columns) + 1))})"
+        )
+        args = [values[column] for column in columns]
+        if self.db_type == "postgresql":
+            async with self.connection.acquire() as conn:
+                return await conn.fetchval(sql + " RETURNING id", *args)
+        cursor = await self.connection.execute(sql, args)
+        await self.connection.commit()
+        return cursor.lastrowid
+
+    async def prefetch(self):
+        """Load the reference tables once so lookups skip the round-trip"""
+        self._prefetched = True
+        for table in _PREFETCH_TABLES:
+            try:
+                rows = await self.fetch(f"SELECT * FROM {table} LIMIT {_PREFETCH_LIMIT + 1}")
+            except Exception as e:
+                logger.warning(f"Prefetch of {table} failed: {e}")
+                continue
+            if len(rows) > _PREFETCH_LIMIT:
+                continue
+            for row in rows:
+                row[_SEARCH_BLOB] = _search_blob(row)
+            self._cache[table] = rows
+
+    async def cached_rows(self, table: str) -> Optional[List[Dict]]:
+        """Prefetched rows for ``table``, or None when it must be queried live"""
+        if not self._prefetched:
+            await self.prefetch()
+        return self._cache.get(table)
+
+    def invalidate(self, table: Optional[str] = None):
+        """Drop prefetched rows so the next lookup reloads them"""
+        if table is None:
+            self._cache.clear()
+            self._prefetched = False
+        elif self._cache.pop(table, None) is not None:
+            self._prefetched = False
+
     async def close(self):
-        """Close database connection"""
+        """Close database connection; the next query reconnects"""
         if self.connection:
             if self.db_type == "postgresql":
                 await self.connection.close()
             elif self.db_type == "sqlite":
                 await self.connection.close()
+        self.connection = None
+        self._connect_attempted = False
+        self.invalidate()
 
 
 # Global database connection
 db = DatabaseConnection()
 
 
+async def close_database():
+    """Close the shared connection; call from job shutdown"""
+    await db.close()
+
+
 @llm.ai_callable(
     description="Query database for customer, order, product, or appointment information"
 )
@@ -101,67 +453,88 @@ async def database_query(
     Returns:
         Query results as a natural language response
     """
-    try:
-        # For demo, use in-memory database
-        if db.connection is None:
-            return await query_demo_database(query_type, search_term, filters)
+    # The model fills these in, so check the shapes before anything calls .lower()
+    if not (isinstance(query_type, str) and _is_optional(search_term, str) and _is_optional(filters, dict)):
+        logger.error(f"Database query with invalid arguments: {query_type!r}, {search_term!r}, {filters!r}")
+        return "I encountered an error while querying the database. Please try again."
+
+    await db.ensure_connected()
 
-        # Real database queries would go here
+    # For demo, use in-memory database
+    if db.connection is None:
+        return await query_demo_database(query_type, search_term, filters)
+
+    try:
         if db.db_type == "postgresql":
             return await query_postgresql(query_type, search_term, filters)
         elif db.db_type == "sqlite":
             return await query_sqlite(query_type, search_term, filters)
-
-    except Exception as e:
+    except _LIVE_QUERY_ERRORS as e:
         logger.error(f"Database query error: {e}")
         return "I encountered an error while querying the database. Please try again."
 
 
+def _apply_search_and_filters(
+    rows: List[Dict],
+    search_term: Optional[str],
+    filters: Optional[Dict[str, Any]]
+) -> List[Dict]:
+    """Rows whose values contain ``search_term`` and match every filter"""
+    # Apply search term
+    if search_term:
+        search_lower = search_term.lower()
+        rows = [item for item in rows if search_lower in item[_SEARCH_BLOB]]
+
+    # Apply all filters in one pass, stopping at the first mismatch
+    if filters:
+        filter_items = list(filters.items())
+        rows = [
+            item for item in rows
+            if all(item.get(key, _MISSING) == value for key, value in filter_items)
+        ]
+
+    return rows
+
+
+@_cached_reply(lambda query_type, search_term, filters: (
+    query_type,
+    search_term.lower() if search_term else None,
+    frozenset(filters.items()) if filters else None
+))
 async def query_demo_database(
     query_type: str,
     search_term: Optional[str],
     filters: Optional[Dict[str, Any]]
 ) -> str:
     """Query the demo in-memory database"""
-    try:
-        if query_type.lower() not in demo_database:
-            return f"I don't have information about {query_type}. I can help with customers, orders, products, or appointments."
-
-        data = demo_database[query_type.lower()]
-        results = data.copy()
-
-        # Apply search term
-        if search_term:
-            search_lower = search_term.lower()
-            results = [
-                item for item in results
-                if any(search_lower in str(value).lower() for value in item.values())
-            ]
-
-        # Apply filters
-        if filters:
-            for key, value in filters.items():
-                results = [
-                    item for item in results
-                    if key in item and item[key] == value
-                ]
-
-        # Format response
-        if not results:
-            return f"I couldn't find any {query_type} matching your criteria."
-
-        if query_type.lower() == "customers":
-            return format_customer_results(results)
-        elif query_type.lower() == "orders":
-            return format_order_results(results)
-        elif query_type.lower() == "products":
-            return format_product_results(results)
-        elif query_type.lower() == "appointments":
-            return format_appointment_results(results)
-
+    qt = query_type.lower()
+    results = demo_database.get(qt)
+    if results is None:
+        return f"I don't have information about {query_type}. I can help with customers, orders, products, or appointments."
+
+    # Start from an index when a filter column has one, otherwise search
+    # the whole table's corpus; filtering builds new lists, so the table
+    # itself is never copied or mutated
+    seeded = _indexed_candidates(qt, filters) if filters else None
+    if seeded is not None:
+        results = seeded
+    elif search_term:
+        results = _search_table(qt, search_term.lower())
+        search_term = None
+
+    results = _apply_search_and_filters(results, search_term, filters)
+
+    # Format response
+    if not results:
+        return f"I couldn't find any {query_type} matching your criteria."
+
+    formatter = _FORMATTERS.get(qt)
+    if formatter is None:
         return f"Found {len(results)} {query_type}."
 
-    except Exception as e:
+    try:
+        return formatter(results)
+    except _ROW_ERRORS as e:
         logger.error(f"Demo database query error: {e}")
         return "I encountered an error while searching the database."
 
@@ -181,46 +554,94 @@ async def get_customer_info(
     Returns:
         Customer details
     """
+    if not isinstance(customer_identifier, str):
+        logger.error(f"Get customer info with invalid identifier: {customer_identifier!r}")
+        return "I encountered an error while retrieving customer information."
+
+    await db.ensure_connected()
+
+    if db.connection is None:
+        return await _demo_customer_info(customer_identifier)
+
     try:
-        # Search in demo database
-        customers = demo_database["customers"]
+        return await _live_customer_info(customer_identifier)
+    except _LIVE_QUERY_ERRORS as e:
+        logger.error(f"Get customer info error: {e}")
+        return "I encountered an error while retrieving customer information."
 
-        # Try to find by ID first
-        try:
-            customer_id = int(customer_identifier)
-            customer = next((c for c in customers if c["id"] == customer_id), None)
-        except ValueError:
-            # Search by name
-            customer = next(
-                (c for c in customers if customer_identifier.lower() in c["name"].lower()),
-                None
-            )
-
-        if not customer:
-            return f"I couldn't find a customer matching '{customer_identifier}'."
-
-        # Get customer's orders
-        orders = [o for o in demo_database["orders"] if o["customer_id"] == customer["id"]]
-
-        response = (
-            f"Customer: {customer['name']}\n"
-            f"Email: {customer['email']}\n"
-            f"Phone: {customer['phone']}\n"
-            f"Status: {customer['status']}\n"
+
+def _format_customer_info(customer: Dict, orders: List[Dict]) -> str:
+    response = (
+        f"Customer: {customer['name']}\n"
+        f"Email: {customer['email']}\n"
+        f"Phone: {customer['phone']}\n"
+        f"Status: {customer['status']}\n"
+    )
+
+    if orders:
+        lines = [response, f"Recent orders: {len(orders)} total"]
+        lines.extend(
+            f"- Order #{order['id']}: ${order['total']:.2f} ({order['status']})"
+            for order in orders[:3]  # Show last 3 orders
         )
+        lines.append("")
+        response = "\n".join(lines)
 
-        if orders:
-            response += f"\nRecent orders: {len(orders)} total\n"
-            for order in orders[:3]:  # Show last 3 orders
-                response += f"- Order #{order['id']}: ${order['total']:.2f} ({order['status']})\n"
+    return response
 
-        return response
 
-    except Exception as e:
+@_cached_reply(lambda customer_identifier: customer_identifier)
+async def _demo_customer_info(customer_identifier: str) -> str:
+    # Digits are an ID, anything else is a name
+    ident = customer_identifier.strip()
+    if ident.isdecimal():
+        customer = _idx_by_id.get("customers", {}).get(int(ident))
+    else:
+        customer = _find_by_name("customers", customer_identifier)
+
+    if not customer:
+        return f"I couldn't find a customer matching '{customer_identifier}'."
+
+    # Get customer's orders
+    orders = _idx_orders_by_customer.get(customer["id"], [])
+
+    try:
+        return _format_customer_info(customer, orders)
+    except _ROW_ERRORS as e:
         logger.error(f"Get customer info error: {e}")
         return "I encountered an error while retrieving customer information."
 
 
+async def _live_first_by_name(table: str, needle: str) -> Optional[Dict]:
+    """Lowest-id row of a connected table whose name contains ``needle``, case-insensitive"""
+    rows = await db.cached_rows(table)
+    if rows is None:
+        rows = await db.fetch(f"SELECT * FROM {table}", stream=True)
+    needle = needle.lower()
+    return min(
+        (row for row in rows if needle in str(row.get("name", "")).lower()),
+        key=lambda row: row.get("id", 0),
+        default=None
+    )
+
+
+async def _live_customer_info(customer_identifier: str) -> str:
+    ident = customer_identifier.strip()
+    if ident.isdecimal():
+        rows = await db.fetch(f"SELECT * FROM customers WHERE id = {db.param(1)}", int(ident))
+        customer = rows[0] if rows else None
+    else:
+        customer = await _live_first_by_name("customers", customer_identifier)
+
+    if not customer:
+        return f"I couldn't find a customer matching '{customer_identifier}'."
+
+    orders = await db.fetch(
+        f"SELECT * FROM orders WHERE customer_id = {db.param(1)} ORDER BY id", customer["id"]
+    )
+    return _format_customer_info(customer, orders)
+
+
 @llm.ai_callable(
     description="Check product inventory and availability"
 )
@@ -236,24 +657,44 @@ async def check_inventory(
     Returns:
         Inventory status
     """
-    try:
-        products = demo_database["products"]
-        product = next(
-            (p for p in products if product_name.lower() in p["name"].lower()),
-            None
-        )
+    if not isinstance(product_name, str):
+        logger.error(f"Inventory check with invalid product name: {product_name!r}")
+        return "I encountered an error while checking inventory."
 
+    await db.ensure_connected()
+
+    if db.connection is None:
+        return await _demo_inventory(product_name)
+
+    try:
+        product = await _live_first_by_name("products", product_name)
         if not product:
             return f"I couldn't find a product matching '{product_name}'."
+        return _format_inventory(product)
+    except _LIVE_QUERY_ERRORS as e:
+        logger.error(f"Inventory check error: {e}")
+        return "I encountered an error while checking inventory."
 
-        stock_status = "in stock" if product["stock"] > 10 else "low stock" if product["stock"] > 0 else "out of stock"
 
-        return (
-            f"{product['name']} - Price: ${product['price']:.2f}\n"
-            f"Current inventory: {product['stock']} units ({stock_status})"
-        )
+def _format_inventory(product: Dict) -> str:
+    stock_status = "in stock" if product["stock"] > 10 else "low stock" if product["stock"] > 0 else "out of stock"
+
+    return (
+        f"{product['name']} - Price: ${product['price']:.2f}\n"
+        f"Current inventory: {product['stock']} units ({stock_status})"
+    )
+
+
+@_cached_reply(lambda product_name: product_name)
+async def _demo_inventory(product_name: str) -> str:
+    product = _find_by_name("products", product_name)
+
+    if not product:
+        return f"I couldn't find a product matching '{product_name}'."
 
-    except Exception as e:
+    try:
+        return _format_inventory(product)
+    except _ROW_ERRORS as e:
         logger.error(f"Inventory check error: {e}")
         return "I encountered an error while checking inventory."
 
@@ -277,59 +718,157 @@ async def update_database(
     Returns:
         Confirmation message
     """
+    if not (isinstance(table, str) and isinstance(operation, str) and isinstance(data, dict)):
+        logger.error(f"Database update with invalid arguments: {table!r}, {operation!r}, {data!r}")
+        return "I encountered an error while updating the database."
+
+    tbl = table.lower()
+    if tbl not in demo_database:
+        return f"I don't have access to the {table} table."
+
+    op_name = operation.lower()
+    if op_name not in _UPDATE_OPS:
+        return f"Unknown operation '{operation}'. Please use 'add', 'update', or 'delete'."
+
+    await db.ensure_connected()
+
+    if db.connection is None:
+        try:
+            return _UPDATE_OPS[op_name](table, tbl, data)
+        except (KeyError, TypeError) as e:
+            logger.error(f"Database update error: {e}")
+            return "I encountered an error while updating the database."
+
+    # Column names go into the SQL text, so only plain identifiers are allowed
+    if not all(isinstance(column, str) and column.isidentifier() for column in data):
+        return "I can only write plain column names."
+
     try:
-        if table.lower() not in demo_database:
-            return f"I don't have access to the {table} table."
+        reply = await _LIVE_UPDATE_OPS[op_name](table, tbl, data)
+    except _LIVE_QUERY_ERRORS as e:
+        logger.error(f"Database update error: {e}")
+        return "I encountered an error while updating the database."
+    db.invalidate(tbl)
+    return reply
 
-        if operation.lower() == "add":
-            # Generate new ID
-            existing_ids = [item.get("id", 0) for item in demo_database[table.lower()]]
-            new_id = max(existing_ids) + 1 if existing_ids else 1
-            data["id"] = new_id
 
-            # Add timestamp
-            data["created_at"] = datetime.now().isoformat()
+# created_at stamps reuse the formatted date and time until the second changes
+_stamp_second = -1
+_stamp_prefix = ""
 
-            # Add to database
-            demo_database[table.lower()].append(data)
 
-            return f"Successfully added new {table.rstrip('s')} with ID {new_id}."
+def _created_at() -> str:
+    """Local ISO timestamp with microseconds, like datetime.now().isoformat()"""
+    global _stamp_second, _stamp_prefix
+    second, nanos = divmod(time.time_ns(), 1_000_000_000)
+    if second != _stamp_second:
+        _stamp_prefix = datetime.fromtimestamp(second).isoformat()
+        _stamp_second = second
+    return f"{_stamp_prefix}.{nanos // 1000:06d}"
 
-        elif operation.lower() == "update":
-            if "id" not in data:
-                return "Please provide an ID for the record to update."
 
-            # Find and update record
-            records = demo_database[table.lower()]
-            record = next((r for r in records if r.get("id") == data["id"]), None)
+def _op_add(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    _check_index_keys(tbl, data)
 
-            if not record:
-                return f"Could not find {table.rstrip('s')} with ID {data['id']}."
+    # Generate new ID
+    new_id = _NEXT_ID[tbl] = _NEXT_ID.get(tbl, 0) + 1
+    data["id"] = new_id
 
-            # Update fields
-            record.update(data)
-            return f"Successfully updated {table.rstrip('s')} {data['id']}."
+    # Add timestamp
+    data["created_at"] = _created_at()
 
-        elif operation.lower() == "delete":
-            if "id" not in data:
-                return "Please provide an ID for the record to delete."
+    # Add to database
+    demo_database[tbl].append(data)
+    _index_row(tbl, data)
+    _reply_cache.clear()
 
-            # Remove record
-            records = demo_database[table.lower()]
-            original_length = len(records)
-            demo_database[table.lower()] = [r for r in records if r.get("id") != data["id"]]
+    return f"Successfully added new {table.rstrip('s')} with ID {new_id}."
 
-            if len(demo_database[table.lower()]) < original_length:
-                return f"Successfully deleted {table.rstrip('s')} {data['id']}."
-            else:
-                return f"Could not find {table.rstrip('s')} with ID {data['id']}."
 
-        else:
-            return f"Unknown operation '{operation}'. Please use 'add', 'update', or 'delete'."
+def _op_update(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    if "id" not in data:
+        return "Please provide an ID for the record to update."
 
-    except Exception as e:
-        logger.error(f"Database update error: {e}")
-        return "I encountered an error while updating the database."
+    # Find and update record
+    record = _idx_by_id.get(tbl, {}).get(data["id"])
+
+    if not record:
+        return f"Could not find {table.rstrip('s')} with ID {data['id']}."
+
+    # Update fields, re-indexing under the new values
+    _check_index_keys(tbl, data)
+    _unindex_row(tbl, record)
+    record.update(data)
+    _index_row(tbl, record)
+    _reply_cache.clear()
+    return f"Successfully updated {table.rstrip('s')} {data['id']}."
+
+
+def _op_delete(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    if "id" not in data:
+        return "Please provide an ID for the record to delete."
+
+    # Remove record in place, locating it through the id index
+    record = _idx_by_id.get(tbl, {}).get(data["id"])
+    if record is None:
+        return f"Could not find {table.rstrip('s')} with ID {data['id']}."
+
+    records = demo_database[tbl]
+    del records[_position(records, record)]
+    _unindex_row(tbl, record)
+    _reply_cache.clear()
+    return f"Successfully deleted {table.rstrip('s')} {data['id']}."
+
+
+_UPDATE_OPS = {
+    "add": _op_add,
+    "update": _op_update,
+    "delete": _op_delete,
+}
+
+
+async def _live_add(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    # The database assigns ids
+    values = {column: value for column, value in data.items() if column != "id"}
+    if not values:
+        return f"Please provide the details of the {table.rstrip('s')} to add."
+    new_id = await db.insert(tbl, values)
+    return f"Successfully added new {table.rstrip('s')} with ID {new_id}."
+
+
+async def _live_update(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    if "id" not in data:
+        return "Please provide an ID for the record to update."
+
+    columns = [column for column in data if column != "id"]
+    if columns:
+        assignments = ", ".join(f"{column} = {db.param(i)}" for i, column in enumerate(columns, 1))
+        changed = await db.execute(
+            f"UPDATE {tbl} SET {assignments} WHERE id = {db.param(len(columns) + 1)}",
+            *(data[column] for column in columns), data["id"]
+        )
+    else:
+        changed = len(await db.fetch(f"SELECT id FROM {tbl} WHERE id = {db.param(1)}", data["id"]))
+
+    if not changed:
+        return f"Could not find {table.rstrip('s')} with ID {data['id']}."
+    return f"Successfully updated {table.rstrip('s')} {data['id']}."
+
+
+async def _live_delete(table: str, tbl: str, data: Dict[str, Any]) -> str:
+    if "id" not in data:
+        return "Please provide an ID for the record to delete."
+
+    if not await db.execute(f"DELETE FROM {tbl} WHERE id = {db.param(1)}", data["id"]):
+        return f"Could not find {table.rstrip('s')} with ID {data['id']}."
+    return f"Successfully deleted {table.rstrip('s')} {data['id']}."
+
+
+_LIVE_UPDATE_OPS = {
+    "add": _live_add,
+    "update": _live_update,
+    "delete": _live_delete,
+}
 
 
 # Helper functions for formatting results
@@ -345,12 +884,10 @@ def format_customer_results(customers: List[Dict]) -> str:
             f"status: {c['status']}"
         )
     else:
-        response = f"Found {len(customers)} customers:\n"
-        for c in customers[:5]:  # Limit to 5 for voice response
-            response += f"- {c['name']} ({c['status']})\n"
-        if len(customers) > 5:
-            response += f"... and {len(customers) - 5} more"
-        return response
+        lines = [f"Found {len(customers)} customers:"]
+        lines.extend(f"- {c['name']} ({c['status']})" for c in customers[:5])  # Limit to 5 for voice response
+        lines.append(f"... and {len(customers) - 5} more" if len(customers) > 5 else "")
+        return "\n".join(lines)
 
 
 def format_order_results(orders: List[Dict]) -> str:
@@ -364,12 +901,11 @@ def format_order_results(orders: List[Dict]) -> str:
             f"status: {o['status']}"
         )
     else:
-        response = f"Found {len(orders)} orders:\n"
-        total_value = sum(o['total'] for o in orders)
-        for o in orders[:5]:
-            response += f"- Order {o['id']}: ${o['total']:.2f} ({o['status']})\n"
-        response += f"Total value: ${total_value:.2f}"
-        return response
+        total_value = sum(map(itemgetter('total'), orders))
+        lines = [f"Found {len(orders)} orders:"]
+        lines.extend(f"- Order {o['id']}: ${o['total']:.2f} ({o['status']})" for o in orders[:5])
+        lines.append(f"Total value: ${total_value:.2f}")
+        return "\n".join(lines)
 
 
 def format_product_results(products: List[Dict]) -> str:
@@ -383,10 +919,10 @@ def format_product_results(products: List[Dict]) -> str:
             f"{p['stock']} units {stock_status}"
         )
     else:
-        response = f"Found {len(products)} products:\n"
-        for p in products[:5]:
-            response += f"- {p['name']}: ${p['price']:.2f} ({p['stock']} units)\n"
-        return response
+        lines = [f"Found {len(products)} products:"]
+        lines.extend(f"- {p['name']}: ${p['price']:.2f} ({p['stock']} units)" for p in products[:5])
+        lines.append("")
+        return "\n".join(lines)
 
 
 def format_appointment_results(appointments: List[Dict]) -> str:
@@ -399,21 +935,59 @@ def format_appointment_results(appointments: List[Dict]) -> str:
             f"for {a['service']}"
         )
     else:
-        response = f"Found {len(appointments)} appointments:\n"
-        for a in appointments[:5]:
-            response += f"- {a['date']} at {a['time']}: {a['customer_name']} ({a['service']})\n"
-        return response
+        lines = [f"Found {len(appointments)} appointments:"]
+        lines.extend(f"- {a['date']} at {a['time']}: {a['customer_name']} ({a['service']})" for a in appointments[:5])
+        lines.append("")
+        return "\n".join(lines)
+
+
+_FORMATTERS = {
+    "customers": format_customer_results,
+    "orders": format_order_results,
+    "products": format_product_results,
+    "appointments": format_appointment_results,
+}
 
 
-# PostgreSQL implementation (placeholder)
+async def query_live_database(query_type: str, search_term: Optional[str], filters: Optional[Dict]) -> str:
+    """
+    Query a connected database, answering from prefetched rows when possible
+
+    Tables that were not prefetched are read live with the filters pushed
+    into the WHERE clause; the search term is matched the same way as in demo
+    mode.
+    """
+    qt = query_type.lower()
+    formatter = _FORMATTERS.get(qt)
+    if formatter is None:
+        return f"I don't have information about {query_type}. I can help with customers, orders, products, or appointments."
+
+    rows = await db.cached_rows(qt)
+    if rows is None:
+        columns = list(filters or ())
+        if not all(isinstance(column, str) and column.isidentifier() for column in columns):
+            return "I can only filter on plain column names."
+        conditions = [f"{column} = {db.param(i)}" for i, column in enumerate(columns, 1)]
+        sql = f"SELECT * FROM {qt}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        rows = await db.fetch(sql, *(filters[column] for column in columns), stream=True)
+        for row in rows:
+            row[_SEARCH_BLOB] = _search_blob(row)
+
+    results = _apply_search_and_filters(rows, search_term, filters)
+    if not results:
+        return f"I couldn't find any {query_type} matching your criteria."
+    return formatter(results)
+
+
+# PostgreSQL implementation
 async def query_postgresql(query_type: str, search_term: Optional[str], filters: Optional[Dict]) -> str:
     """Query PostgreSQL database"""
-    # This would contain actual PostgreSQL queries using asyncpg
-    return "PostgreSQL queries not yet implemented"
+    return await query_live_database(query_type, search_term, filters)
 
 
-# SQLite implementation (placeholder)
+# SQLite implementation
 async def query_sqlite(query_type: str, search_term: Optional[str], filters: Optional[Dict]) -> str:
     """Query SQLite database"""
-    # This would contain actual SQLite queries using aiosqlite
-    return "SQLite queries not yet implemented"
\ No newline at end of file
+    return await query_live_database(query_type, search_term, filters)
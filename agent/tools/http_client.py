@@ -0,0 +1,30 @@
+"""
+Shared HTTP client for the tool modules
+One pooled HTTP/2 client per process so tool calls reuse warm connections
+"""
+
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+        )
+    return _client
+
+
+async def aclose():
+    """Close the shared client; call from worker shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
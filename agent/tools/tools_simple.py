@@ -3,29 +3,39 @@ Simplified Tools for LiveKit 1.2.17 Compatibility
 All tools work without decorators
 """
 
+import ast
 import logging
+import math
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Mock data, normalized once at import: (°C, °F, condition)
+def _with_fahrenheit(celsius: int, condition: str) -> tuple:
+    return celsius, int(celsius * 9/5 + 32), condition
+
+_WEATHER = {
+    "san francisco": _with_fahrenheit(18, "Partly cloudy"),
+    "new york": _with_fahrenheit(22, "Clear"),
+    "london": _with_fahrenheit(15, "Light rain"),
+}
+_DEFAULT_WEATHER = _with_fahrenheit(20, "Clear")
+_BUSY_DATES = frozenset({"2025-11-05", "2025-11-10", "2025-11-15"})
+
 # Weather Tool
 async def get_weather(location: str, units: str = "metric") -> str:
     """Get weather information for a location."""
     logger.info(f"Weather request for {location}")
 
-    # Mock weather data
-    weather_map = {
-        "san francisco": {"temp": 18, "condition": "Partly cloudy"},
-        "new york": {"temp": 22, "condition": "Clear"},
-        "london": {"temp": 15, "condition": "Light rain"},
-    }
-
-    weather = weather_map.get(location.lower(), {"temp": 20, "condition": "Clear"})
-    temp_unit = "°C" if units == "metric" else "°F"
-    temp = weather["temp"] if units == "metric" else int(weather["temp"] * 9/5 + 32)
+    temp_c, temp_f, condition = _WEATHER.get(location.lower(), _DEFAULT_WEATHER)
+    if units == "metric":
+        temp, temp_unit = temp_c, "°C"
+    else:
+        temp, temp_unit = temp_f, "°F"
 
-    return f"The weather in {location} is {weather['condition']} with a temperature of {temp}{temp_unit}."
+    return f"The weather in {location} is {condition} with a temperature of {temp}{temp_unit}."
 
 # Calendar Tool
 async def check_calendar(date: str = None) -> str:
@@ -35,10 +45,7 @@ async def check_calendar(date: str = None) -> str:
 
     logger.info(f"Checking calendar for {date}")
 
-    # Mock calendar data
-    busy_dates = ["2025-11-05", "2025-11-10", "2025-11-15"]
-
-    if date in busy_dates:
+    if date in _BUSY_DATES:
         return f"You have appointments scheduled on {date}. The day is busy."
     else:
         return f"You have no appointments on {date}. The day is free."
@@ -74,24 +81,61 @@ async def recommend_activity(weather: str = None, preferences: str = None) -> st
     """Recommend activities based on weather and preferences."""
     logger.info(f"Recommending activity for weather: {weather}, preferences: {preferences}")
 
-    if weather and "rain" in weather.lower():
+    weather_lc = weather.lower() if weather else ""
+
+    if "rain" in weather_lc:
         return "Since it's raining, I recommend indoor activities like visiting a museum, watching a movie, or reading a book."
-    elif weather and "sunny" in weather.lower():
+    elif "sunny" in weather_lc:
         return "It's sunny! Great day for outdoor activities like hiking, having a picnic, or going to the beach."
     else:
         return "I suggest checking local events, trying a new restaurant, or exploring a nearby neighborhood."
 
 # Simple Calculation Tool
+_CALC_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.FloorDiv,
+    ast.USub, ast.UAdd,
+)
+
+# Largest integer power calculate() will build, in bits (about 3,000 digits)
+_MAX_POW_BITS = 10_000
+
+def _checked_pow(base, exponent):
+    """base ** exponent, refusing integer powers too big to compute on the event loop."""
+    if (isinstance(base, int) and isinstance(exponent, int) and abs(base) > 1
+            and exponent * math.log2(abs(base)) > _MAX_POW_BITS):
+        raise ValueError("Exponent too large")
+    return base ** exponent
+
+class _CheckPowers(ast.NodeTransformer):
+    """Rewrite a ** b as _pow(a, b) so every power goes through _checked_pow."""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(ast.Name("_pow", ast.Load()), [node.left, node.right], [])
+            return ast.copy_location(call, node)
+        return node
+
+@lru_cache(maxsize=512)
+def _compile_expr(expression: str):
+    """Parse and compile an arithmetic expression, rejecting anything else."""
+    tree = ast.parse(expression, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _CALC_NODES):
+            raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+            raise ValueError("Only numeric constants are allowed")
+    tree = ast.fix_missing_locations(_CheckPowers().visit(tree))
+    return compile(tree, "<calc>", "eval")
+
 async def calculate(expression: str) -> str:
     """Perform simple calculations."""
     logger.info(f"Calculating: {expression}")
 
     try:
-        # Only allow safe math operations
-        allowed_names = {
-            k: v for k, v in {"__builtins__": None}.items()
-        }
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
+        # Only plain arithmetic is compiled; repeat expressions hit the cache
+        result = eval(_compile_expr(expression), {"__builtins__": {}, "_pow": _checked_pow}, {})
         return f"The result of {expression} is {result}"
     except Exception as e:
         return f"I couldn't calculate that. Please provide a simple mathematical expression."
@@ -99,16 +143,14 @@ async def calculate(expression: str) -> str:
 # Time Tool
 async def get_current_time(timezone: str = None) -> str:
     """Get the current time."""
-    from datetime import datetime
-
     # Note: pytz handling removed for simplicity
     # Could be added back if pytz is installed
 
-    time = datetime.now()
+    stamp = datetime.now().strftime('%I:%M %p on %B %d, %Y')
     if timezone:
-        return f"The current time is {time.strftime('%I:%M %p on %B %d, %Y')} (timezone support requires pytz)"
+        return f"The current time is {stamp} (timezone support requires pytz)"
     else:
-        return f"The current time is {time.strftime('%I:%M %p on %B %d, %Y')}"
+        return f"The current time is {stamp}"
 
 # Note-taking Tool
 async def take_note(content: str, title: str = None) -> str:
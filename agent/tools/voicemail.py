@@ -3,12 +3,30 @@ Voicemail Detection Tool Implementation
 Detects voicemail systems and handles message leaving
 """
 
+import re
 import logging
 import asyncio
-from typing import Optional, Tuple
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import List, Optional, Tuple
 from livekit.agents import llm
 from livekit.agents.pipeline import VoicePipelineAgent
 
+# Keyword matching backends, fastest first. hyperscan compiles every keyword
+# into one DFA and reports each keyword once however often it repeats;
+# pyahocorasick is the portable single-pass fallback; without either, each
+# keyword is checked with a substring test.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
 # Common voicemail detection patterns
@@ -49,6 +67,148 @@ HUMAN_GREETING_PATTERNS = [
     "good evening"
 ]
 
+# Patterns used to pull details out of greetings, compiled once
+_PRESS_RE = re.compile(r'press (\d+) for (\w+)')
+_TIME_RE = re.compile(r'\d{1,2}(?::\d{2})?\s*(?:am|pm|AM|PM)')
+_MONTHS = ("january", "february", "march", "april", "may", "june",
+           "july", "august", "september", "october", "november", "december")
+_MONTH_INDEX = {month: i for i, month in enumerate(_MONTHS)}
+_MONTH_DAY_RE = re.compile(rf'({"|".join(_MONTHS)})\s+(\d{{1,2}})')
+_DATE_RE = re.compile(r'\d{1,2}/\d{1,2}')
+_WORD_RE = re.compile(r'\S+')  # same word boundaries as str.split()
+
+# Every byte except ASCII 0-9, for bytes.translate's delete argument
+_NON_DIGIT_BYTES = bytes(c for c in range(256) if not 0x30 <= c <= 0x39)
+
+# Keyword groups matched together by _keyword_hits
+_VOICEMAIL = "voicemail"
+_HUMAN = "human"
+_INSTRUCTIONS = "instructions"
+_INSTRUCTION_WORDS = ("press", "option", "menu")
+_KEYWORD_GROUPS = (
+    (_VOICEMAIL, VOICEMAIL_KEYWORDS),
+    (_HUMAN, HUMAN_GREETING_PATTERNS),
+    (_INSTRUCTIONS, _INSTRUCTION_WORDS),
+)
+_GREETING_FREE_GROUPS = tuple(entry for entry in _KEYWORD_GROUPS if entry[0] != _HUMAN)
+_KEYWORD_TAGS = tuple(
+    (group, i) for group, keywords in _KEYWORD_GROUPS for i in range(len(keywords))
+)
+
+
+def _build_hyperscan_db():
+    """Hyperscan database whose match ids index _KEYWORD_TAGS"""
+    if hyperscan is None:
+        return None
+    expressions = [
+        re.escape(keyword).encode() for _, keywords in _KEYWORD_GROUPS for keyword in keywords
+    ]
+    database = hyperscan.Database()
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+    )
+    return database
+
+
+def _build_automaton():
+    """Aho-Corasick automaton over every keyword, tagged (group, index)"""
+    if ahocorasick is None:
+        return None
+    tags = {}
+    for group, keywords in _KEYWORD_GROUPS:
+        for i, keyword in enumerate(keywords):
+            tags.setdefault(keyword, []).append((group, i))
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_tags in tags.items():
+        automaton.add_word(keyword, tuple(keyword_tags))
+    automaton.make_automaton()
+    return automaton
+
+
+def _confidence(voicemail_score: int, human_answered: bool, is_long_message: bool, has_instructions: bool) -> float:
+    """Voicemail confidence for one combination of detection signals"""
+    confidence = min(voicemail_score / 3, 1.0)  # Cap at 3 keywords for 100%
+    if human_answered:
+        confidence *= 0.3  # Reduce confidence if human patterns detected
+    if is_long_message:
+        confidence += 0.1
+    if has_instructions:
+        confidence += 0.2
+    return min(confidence, 1.0)
+
+
+# Every outcome of _confidence, indexed [min(score, 3)][human][long][instructions]
+_CONFIDENCE = tuple(
+    tuple(
+        tuple(
+            tuple(_confidence(score, human, long, instructions) for instructions in (False, True))
+            for long in (False, True)
+        )
+        for human in (False, True)
+    )
+    for score in range(4)
+)
+
+
+_hyperscan_db = _build_hyperscan_db()
+_automaton = None if _hyperscan_db is not None else _build_automaton()
+
+
+def _keyword_hits(text: str, groups: tuple = _KEYWORD_GROUPS) -> set:
+    """
+    (group, index) for every keyword that occurs in ``text``; the matching
+    libraries scan all groups in the same pass, so ``groups`` only limits
+    the substring fallback
+    """
+    if _hyperscan_db is not None:
+        hits = set()
+        _hyperscan_db.scan(
+            text.encode(),
+            match_event_handler=lambda match_id, *_: hits.add(_KEYWORD_TAGS[match_id])
+        )
+        return hits
+    if _automaton is not None:
+        return {tag for _, tags in _automaton.iter(text) for tag in tags}
+    return {
+        (group, i)
+        for group, keywords in groups
+        for i, keyword in enumerate(keywords)
+        if keyword in text
+    }
+
+
+def _score_transcript(transcript: str) -> Tuple[float, List[str]]:
+    """
+    Voicemail confidence for a transcript, with the voicemail keywords
+    found in keyword-list order
+    """
+    transcript_lower = transcript.lower()
+
+    # Human greetings only count in short transcripts, so skip scanning for them otherwise
+    short = len(transcript_lower) < 50
+    hits = _keyword_hits(transcript_lower, _KEYWORD_GROUPS if short else _GREETING_FREE_GROUPS)
+
+    # Check for voicemail indicators, reported in keyword-list order
+    detected_keywords = [
+        keyword for i, keyword in enumerate(VOICEMAIL_KEYWORDS) if (_VOICEMAIL, i) in hits
+    ]
+    voicemail_score = len(detected_keywords)
+
+    # Check for human greeting patterns (negative indicators)
+    human_answered = short and any(group == _HUMAN for group, _ in hits)
+    if voicemail_score >= 3 and not human_answered:
+        return 1.0, detected_keywords  # Already certain; the bonuses can't change it
+
+    # Additional checks; the split stops once a 21st word is found
+    is_long_message = len(transcript_lower.split(None, 20)) > 20  # Voicemails tend to be longer
+    has_instructions = any(group == _INSTRUCTIONS for group, _ in hits)
+
+    voicemail_confidence = _CONFIDENCE[min(voicemail_score, 3)][human_answered][is_long_message][has_instructions]
+    return voicemail_confidence, detected_keywords
+
 
 @llm.ai_callable(
     description="Detect if the call has reached a voicemail system"
@@ -71,41 +231,7 @@ async def detect_voicemail(
         if not transcript:
             return "No audio detected yet. Please wait for the greeting to finish."
 
-        transcript_lower = transcript.lower()
-
-        # Check for voicemail indicators
-        voicemail_score = 0
-        detected_keywords = []
-
-        for keyword in VOICEMAIL_KEYWORDS:
-            if keyword in transcript_lower:
-                voicemail_score += 1
-                detected_keywords.append(keyword)
-
-        # Check for human greeting patterns (negative indicators)
-        human_score = 0
-        for pattern in HUMAN_GREETING_PATTERNS:
-            if pattern in transcript_lower and len(transcript_lower) < 50:
-                human_score += 1
-
-        # Calculate confidence
-        total_keywords = len(VOICEMAIL_KEYWORDS)
-        voicemail_confidence = min(voicemail_score / 3, 1.0)  # Cap at 3 keywords for 100%
-
-        # Adjust confidence based on human patterns
-        if human_score > 0:
-            voicemail_confidence *= 0.3  # Reduce confidence if human patterns detected
-
-        # Additional checks
-        is_long_message = len(transcript_lower.split()) > 20  # Voicemails tend to be longer
-        has_instructions = any(word in transcript_lower for word in ["press", "option", "menu"])
-
-        if is_long_message:
-            voicemail_confidence += 0.1
-        if has_instructions:
-            voicemail_confidence += 0.2
-
-        voicemail_confidence = min(voicemail_confidence, 1.0)
+        voicemail_confidence, detected_keywords = _score_transcript(transcript)
 
         # Make determination
         if voicemail_confidence >= confidence_threshold:
@@ -201,20 +327,19 @@ async def analyze_voicemail_greeting(
         transcript_lower = transcript.lower()
 
         # Look for business name (usually after "you've reached" or "this is")
-        if "you've reached" in transcript_lower:
-            start = transcript_lower.index("you've reached") + len("you've reached")
-            words = transcript[start:].split()[:5]  # Get next 5 words
-            info["business_name"] = " ".join(words).strip(",.")
-        elif "this is the office of" in transcript_lower:
-            start = transcript_lower.index("this is the office of") + len("this is the office of")
-            words = transcript[start:].split()[:5]
-            info["business_name"] = " ".join(words).strip(",.")
+        for lead_in in ("you've reached", "this is the office of"):
+            start = transcript_lower.find(lead_in)
+            if start >= 0:
+                # Next 5 words, scanned in place without copying the tail
+                words = islice(_WORD_RE.finditer(transcript, start + len(lead_in)), 5)
+                info["business_name"] = " ".join(match.group() for match in words).strip(",.")
+                break
 
         # Look for office hours
         hour_keywords = ["hours are", "open from", "monday through", "monday to"]
         for keyword in hour_keywords:
-            if keyword in transcript_lower:
-                start = transcript_lower.index(keyword)
+            start = transcript_lower.find(keyword)
+            if start >= 0:
                 hours_text = transcript[start:start+100]  # Get next 100 chars
                 info["office_hours"] = extract_hours(hours_text)
                 break
@@ -222,17 +347,15 @@ async def analyze_voicemail_greeting(
         # Look for alternative contact
         if "press" in transcript_lower and "for" in transcript_lower:
             # Extract menu options
-            import re
-            pattern = r'press (\d+) for (\w+)'
-            matches = re.findall(pattern, transcript_lower)
+            matches = _PRESS_RE.findall(transcript_lower)
             if matches:
                 info["menu_options"] = matches
 
         # Look for return date (out of office)
         return_keywords = ["return on", "back on", "returning", "will be back"]
         for keyword in return_keywords:
-            if keyword in transcript_lower:
-                start = transcript_lower.index(keyword)
+            start = transcript_lower.find(keyword)
+            if start >= 0:
                 date_text = transcript[start:start+50]
                 info["return_date"] = extract_date(date_text)
                 break
@@ -285,15 +408,28 @@ async def wait_for_beep(
         return "Proceeding to leave message."
 
 
+# Most recent words kept for re-running detection on each new segment
+_DETECTION_WINDOW_WORDS = 200
+# detect_voicemail's default confidence_threshold
+_DETECTION_THRESHOLD = 0.7
+
+
 class VoicemailHandler:
     """Advanced voicemail handling with state management"""
 
     def __init__(self):
         self.state = "listening"  # listening, detected, leaving_message, completed
-        self.transcript_buffer = ""
+        self._segments = deque()  # (segment, word count), trailing window only
+        self._window_words = 0
+        self.word_count = 0  # words heard on this call
         self.detection_confidence = 0.0
         self.message_left = False
 
+    @property
+    def transcript_buffer(self) -> str:
+        """Recent transcript within the detection window"""
+        return "".join(" " + segment for segment, _ in self._segments)
+
     async def process_audio_segment(self, transcript: str) -> Tuple[str, str]:
         """
         Process incoming audio to detect and handle voicemail
@@ -305,33 +441,18 @@ class VoicemailHandler:
             Tuple of (state, action)
         """
         try:
-            self.transcript_buffer += " " + transcript
-
-            if self.state == "listening":
-                # Detect voicemail
-                result = await detect_voicemail(self.transcript_buffer)
-
-                if "Voicemail detected" in result:
-                    self.state = "detected"
-                    self.detection_confidence = float(result.split("%")[0].split()[-1]) / 100
-                    return ("detected", "wait_for_beep")
-
-                elif len(self.transcript_buffer.split()) > 50:
-                    # If we've heard a lot and no voicemail detected, assume human
-                    self.state = "human"
-                    return ("human", "continue_conversation")
-
-            elif self.state == "detected":
-                # Wait for beep
-                if "beep" in transcript.lower() or len(self.transcript_buffer.split()) > 100:
-                    self.state = "leaving_message"
-                    return ("leaving_message", "leave_message")
-
-            elif self.state == "leaving_message":
-                # Message is being left
-                self.state = "completed"
-                self.message_left = True
-                return ("completed", "end_call")
+            words = len(transcript.split())
+            self._segments.append((transcript, words))
+            self._window_words += words
+            self.word_count += words
+            while self._window_words > _DETECTION_WINDOW_WORDS and len(self._segments) > 1:
+                self._window_words -= self._segments.popleft()[1]
+
+            handler = self._STATE_HANDLERS.get(self.state)
+            if handler is not None:
+                transition = handler(self, transcript)
+                if transition is not None:
+                    return transition
 
             return (self.state, "continue")
 
@@ -339,16 +460,55 @@ class VoicemailHandler:
             logger.error(f"Voicemail handler error: {e}")
             return ("error", "continue")
 
+    def _on_listening(self, transcript: str) -> Optional[Tuple[str, str]]:
+        # Detect voicemail
+        confidence, _ = _score_transcript(self.transcript_buffer)
+
+        if confidence >= _DETECTION_THRESHOLD:
+            self.state = "detected"
+            self.detection_confidence = confidence
+            return ("detected", "wait_for_beep")
+
+        elif self.word_count > 50:
+            # If we've heard a lot and no voicemail detected, assume human
+            self.state = "human"
+            return ("human", "continue_conversation")
+        return None
+
+    def _on_detected(self, transcript: str) -> Optional[Tuple[str, str]]:
+        # Wait for beep
+        if "beep" in transcript.lower() or self.word_count > 100:
+            self.state = "leaving_message"
+            return ("leaving_message", "leave_message")
+        return None
+
+    def _on_leaving_message(self, transcript: str) -> Optional[Tuple[str, str]]:
+        # Message is being left
+        self.state = "completed"
+        self.message_left = True
+        return ("completed", "end_call")
+
+    # States without an entry (human, completed) just keep listening
+    _STATE_HANDLERS = {
+        "listening": _on_listening,
+        "detected": _on_detected,
+        "leaving_message": _on_leaving_message,
+    }
+
     def reset(self):
         """Reset the handler for a new call"""
         self.state = "listening"
-        self.transcript_buffer = ""
+        self._segments.clear()
+        self._window_words = 0
+        self.word_count = 0
         self.detection_confidence = 0.0
         self.message_left = False
 
 
 # Helper functions
 
+# The same callback number is read out in every voicemail a campaign leaves
+@lru_cache(maxsize=256)
 def format_phone_number(number: str, slow: bool = False) -> str:
     """
     Format phone number for speech
@@ -360,8 +520,11 @@ def format_phone_number(number: str, slow: bool = False) -> str:
     Returns:
         Formatted phone number for TTS
     """
-    # Remove non-numeric characters
-    digits = ''.join(filter(str.isdigit, number))
+    # Remove non-numeric characters; non-ASCII input may hold other digit scripts
+    if number.isascii():
+        digits = number.encode("ascii").translate(None, _NON_DIGIT_BYTES).decode("ascii")
+    else:
+        digits = ''.join(filter(str.isdigit, number))
 
     if len(digits) == 10:  # US number
         if slow:
@@ -382,10 +545,8 @@ def format_phone_number(number: str, slow: bool = False) -> str:
 
 def extract_hours(text: str) -> Optional[str]:
     """Extract office hours from text"""
-    import re
     # Look for time patterns
-    time_pattern = r'\d{1,2}(?::\d{2})?\s*(?:am|pm|AM|PM)'
-    times = re.findall(time_pattern, text)
+    times = _TIME_RE.findall(text)
 
     if len(times) >= 2:
         return f"{times[0]} to {times[1]}"
@@ -394,22 +555,17 @@ def extract_hours(text: str) -> Optional[str]:
 
 def extract_date(text: str) -> Optional[str]:
     """Extract date from text"""
-    import re
-    # Look for date patterns
-    months = ["january", "february", "march", "april", "may", "june",
-              "july", "august", "september", "october", "november", "december"]
-
-    for month in months:
-        if month in text.lower():
-            # Try to find day
-            pattern = rf'{month}\s+(\d{{1,2}})'
-            match = re.search(pattern, text.lower())
-            if match:
-                return f"{month.capitalize()} {match.group(1)}"
+    # Look for "<month> <day>"; with several, the earliest month of the year wins
+    match = min(
+        _MONTH_DAY_RE.finditer(text.lower()),
+        key=lambda m: _MONTH_INDEX[m.group(1)],
+        default=None
+    )
+    if match:
+        return f"{match.group(1).capitalize()} {match.group(2)}"
 
     # Look for other date formats
-    date_pattern = r'\d{1,2}/\d{1,2}'
-    match = re.search(date_pattern, text)
+    match = _DATE_RE.search(text)
     if match:
         return match.group(0)
 
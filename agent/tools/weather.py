@@ -4,13 +4,52 @@ Provides weather information using OpenWeatherMap or similar API
 """
 
 import os
+import re
 import httpx
 import logging
-from typing import Optional
+from collections import Counter
+from typing import List, Optional, Tuple
 from livekit.agents import llm
 
+from .cache import TTLCache
+from .http_client import get_client
+
+# orjson decodes the 40-entry forecast payload several times faster
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 logger = logging.getLogger(__name__)
 
+# Conditions change slowly, and check_weather_conditions re-asks weather_tool
+# for a place the caller usually just heard about; keyed by normalized location
+_weather_cache = TTLCache(maxsize=256, ttl=300)
+_forecast_cache = TTLCache(maxsize=256, ttl=300)
+
+def _summarize_forecast(items) -> List[Tuple[str, float, str]]:
+    """
+    Fold 3-hourly forecast entries into (date, average temp, most common
+    description) per day, in one pass
+    """
+    days = {}  # date -> [temp sum, entry count, description counts]
+    for item in items:
+        date = item["dt_txt"].partition(" ")[0]
+        day = days.get(date)
+        if day is None:
+            day = days[date] = [0.0, 0, Counter()]
+        day[0] += item["main"]["temp"]
+        day[1] += 1
+        day[2][item["weather"][0]["description"]] += 1
+    return [
+        (date, temp_sum / count, descriptions.most_common(1)[0][0])
+        for date, (temp_sum, count, descriptions) in days.items()
+    ]
+
+
+# Pulls the Celsius reading back out of weather_tool's reply
+_TEMP_RE = re.compile(r'temperature is ([\d.]+)°C')
+
 @llm.ai_callable(
     description="Get current weather information for a specific location"
 )
@@ -29,10 +68,14 @@ async def weather_tool(
         Weather information as a natural language string
     """
     try:
-        api_key = os.getenv("OPENWEATHER_API_KEY", "demo")
+        cache_key = (location.strip().lower(), units)
+        data = _weather_cache.get(cache_key)
 
-        # Use OpenWeatherMap API
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        if data is None:
+            api_key = os.getenv("OPENWEATHER_API_KEY", "demo")
+
+            # Use OpenWeatherMap API
+            client = get_client()
             response = await client.get(
                 "https://api.openweathermap.org/data/2.5/weather",
                 params={
@@ -42,31 +85,30 @@ async def weather_tool(
                 }
             )
 
-            if response.status_code == 200:
-                data = response.json()
+            if response.status_code == 404:
+                return f"I couldn't find weather information for {location}. Please check the location name."
+            elif response.status_code != 200:
+                logger.error(f"Weather API error: {response.status_code}")
+                return "I'm having trouble accessing weather information right now. Please try again later."
 
-                temp = data["main"]["temp"]
-                feels_like = data["main"]["feels_like"]
-                description = data["weather"][0]["description"]
-                humidity = data["main"]["humidity"]
-                wind_speed = data["wind"]["speed"]
+            data = response.json()
+            _weather_cache.set(cache_key, data)
 
-                unit_symbol = "°C" if units == "metric" else "°F"
-                wind_unit = "m/s" if units == "metric" else "mph"
+        temp = data["main"]["temp"]
+        feels_like = data["main"]["feels_like"]
+        description = data["weather"][0]["description"]
+        humidity = data["main"]["humidity"]
+        wind_speed = data["wind"]["speed"]
 
-                return (
-                    f"The weather in {location} is currently {description}. "
-                    f"The temperature is {temp}{unit_symbol}, "
-                    f"feels like {feels_like}{unit_symbol}. "
-                    f"Humidity is {humidity}% and wind speed is {wind_speed} {wind_unit}."
-                )
+        unit_symbol = "°C" if units == "metric" else "°F"
+        wind_unit = "m/s" if units == "metric" else "mph"
 
-            elif response.status_code == 404:
-                return f"I couldn't find weather information for {location}. Please check the location name."
-
-            else:
-                logger.error(f"Weather API error: {response.status_code}")
-                return "I'm having trouble accessing weather information right now. Please try again later."
+        return (
+            f"The weather in {location} is currently {description}. "
+            f"The temperature is {temp}{unit_symbol}, "
+            f"feels like {feels_like}{unit_symbol}. "
+            f"Humidity is {humidity}% and wind speed is {wind_speed} {wind_unit}."
+        )
 
     except httpx.TimeoutException:
         logger.error("Weather API timeout")
@@ -97,10 +139,15 @@ async def weather_forecast(
         Weather forecast as a natural language string
     """
     try:
-        api_key = os.getenv("OPENWEATHER_API_KEY", "demo")
         days = min(max(days, 1), 5)  # Clamp between 1 and 5
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        cache_key = (location.strip().lower(), units, days)
+        summary = _forecast_cache.get(cache_key)
+
+        if summary is None:
+            api_key = os.getenv("OPENWEATHER_API_KEY", "demo")
+
+            client = get_client()
             response = await client.get(
                 "https://api.openweathermap.org/data/2.5/forecast",
                 params={
@@ -111,34 +158,20 @@ async def weather_forecast(
                 }
             )
 
-            if response.status_code == 200:
-                data = response.json()
-                forecasts = {}
-
-                # Group forecasts by day
-                for item in data["list"]:
-                    date = item["dt_txt"].split()[0]
-                    if date not in forecasts:
-                        forecasts[date] = {
-                            "temps": [],
-                            "descriptions": []
-                        }
-                    forecasts[date]["temps"].append(item["main"]["temp"])
-                    forecasts[date]["descriptions"].append(item["weather"][0]["description"])
-
-                unit_symbol = "°C" if units == "metric" else "°F"
-                forecast_text = f"Weather forecast for {location}: "
-
-                for date, info in list(forecasts.items())[:days]:
-                    avg_temp = sum(info["temps"]) / len(info["temps"])
-                    # Get most common description
-                    description = max(set(info["descriptions"]), key=info["descriptions"].count)
-                    forecast_text += f"{date}: {description}, average temperature {avg_temp:.1f}{unit_symbol}. "
+            if response.status_code != 200:
+                return f"I couldn't get the forecast for {location}. Please check the location name."
 
-                return forecast_text
+            # Group forecasts by day
+            summary = _summarize_forecast(_json_loads(response.content)["list"])
+            _forecast_cache.set(cache_key, summary)
 
-            else:
-                return f"I couldn't get the forecast for {location}. Please check the location name."
+        unit_symbol = "°C" if units == "metric" else "°F"
+        parts = [f"Weather forecast for {location}: "]
+        parts.extend(
+            f"{date}: {description}, average temperature {avg_temp:.1f}{unit_symbol}. "
+            for date, avg_temp, description in summary[:days]
+        )
+        return "".join(parts)
 
     except Exception as e:
         logger.error(f"Weather forecast error: {e}")
@@ -167,13 +200,13 @@ async def check_weather_conditions(
         weather_info = await weather_tool(location, "metric")
 
         # Parse basic conditions from the response
-        is_raining = "rain" in weather_info.lower()
-        is_snowing = "snow" in weather_info.lower()
-        is_clear = "clear" in weather_info.lower() or "sunny" in weather_info.lower()
+        conditions = weather_info.lower()
+        is_raining = "rain" in conditions
+        is_snowing = "snow" in conditions
+        is_clear = "clear" in conditions or "sunny" in conditions
 
         # Extract temperature (simple parsing)
-        import re
-        temp_match = re.search(r'temperature is ([\d.]+)°C', weather_info)
+        temp_match = _TEMP_RE.search(weather_info)
         temp = float(temp_match.group(1)) if temp_match else 20
 
         # Activity-specific recommendations
@@ -4,9 +4,11 @@ Core End-to-End Test for ClaudeVoice Agent
 Tests the essential components without tool decorators
 """
 
+import ast
 import sys
 import os
 import asyncio
+from importlib.util import find_spec
 from pathlib import Path
 
 # Load environment variables FIRST
@@ -22,18 +24,17 @@ else:
 # Add agent directory to path
 sys.path.insert(0, str(Path(__file__).parent / "agent"))
 
+# Variables every e2e check depends on
+REQUIRED_ENV_VARS = ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "OPENAI_API_KEY")
+
 def test_environment():
     """Test environment variables"""
     print("\n" + "="*60)
     print("TEST 1: Environment Variables")
     print("="*60)
 
-    required_vars = {
-        "LIVEKIT_URL": os.getenv("LIVEKIT_URL"),
-        "LIVEKIT_API_KEY": os.getenv("LIVEKIT_API_KEY"),
-        "LIVEKIT_API_SECRET": os.getenv("LIVEKIT_API_SECRET"),
-        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY")
-    }
+    env = os.environ
+    required_vars = {name: env.get(name) for name in REQUIRED_ENV_VARS}
 
     all_good = True
     for name, value in required_vars.items():
@@ -65,10 +66,10 @@ def test_dependencies():
         import_name = package_info[1] if len(package_info) > 2 else package_info[0]
         display_name = package_info[-1]
 
-        try:
-            __import__(import_name)
+        # find_spec only locates the package; nothing is imported or initialized
+        if find_spec(import_name) is not None:
             print(f"  {display_name}: ✅ INSTALLED")
-        except ImportError:
+        else:
             print(f"  {display_name}: ❌ NOT INSTALLED")
             all_good = False
 
@@ -112,36 +113,33 @@ async def test_livekit_token():
 
 async def test_openai_connection():
     """Test OpenAI API connection"""
-    print("\n" + "="*60)
-    print("TEST 4: OpenAI API Connection")
-    print("="*60)
-
+    # Make the request before printing, so this section's output stays in one
+    # piece while the other checks run during the round trip
+    model, error = None, None
     try:
-        import openai
-
-        # Set API key
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        from openai import AsyncOpenAI
 
-        # Try a simple completion
-        client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
+        # Async client so the check doesn't block the event loop; closed on exit
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) as client:
+            # A metadata lookup proves the key and connectivity without a billable completion
+            model = await client.models.retrieve("gpt-3.5-turbo")
+    except Exception as e:
+        error = e
 
-        # Test with a simple prompt
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Say 'test successful'"}],
-            max_tokens=10
-        )
+    print("\n" + "="*60)
+    print("TEST 4: OpenAI API Connection")
+    print("="*60)
 
-        if response and response.choices:
-            print(f"  OpenAI API: ✅ CONNECTED")
-            print(f"  Response: {response.choices[0].message.content}")
-            return True
-        else:
-            print(f"  OpenAI API: ❌ NO RESPONSE")
-            return False
+    if error is not None:
+        print(f"  OpenAI API: ❌ ERROR - {str(error)[:100]}")
+        return False
 
-    except Exception as e:
-        print(f"  OpenAI API: ❌ ERROR - {str(e)[:100]}")
+    if model and model.id == "gpt-3.5-turbo":
+        print(f"  OpenAI API: ✅ CONNECTED")
+        print(f"  Model: {model.id} (owned by {model.owned_by})")
+        return True
+    else:
+        print(f"  OpenAI API: ❌ UNEXPECTED RESPONSE")
         return False
 
 async def test_agent_components():
@@ -151,6 +149,7 @@ async def test_agent_components():
     print("="*60)
 
     results = {}
+    openai_key = os.getenv("OPENAI_API_KEY")
 
     # Test config loading
     try:
@@ -172,12 +171,20 @@ async def test_agent_components():
         results["VAD"] = False
         print(f"  Voice Activity Detection: ❌ ERROR - {e}")
 
-    # Test STT
+    # Import the OpenAI plugin once for the STT, TTS and LLM checks; a
+    # failure is reported under each of them
     try:
         from livekit.plugins import openai as lk_openai
+    except ImportError as e:
+        lk_openai, plugin_error = None, e
+
+    # Test STT
+    try:
+        if lk_openai is None:
+            raise plugin_error
         stt = lk_openai.STT(
             model="whisper-1",
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=openai_key
         )
         results["STT"] = True
         print(f"  Speech-to-Text: ✅ READY")
@@ -187,11 +194,12 @@ async def test_agent_components():
 
     # Test TTS
     try:
-        from livekit.plugins import openai as lk_openai
+        if lk_openai is None:
+            raise plugin_error
         tts = lk_openai.TTS(
             model="tts-1",
             voice="alloy",
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=openai_key
         )
         results["TTS"] = True
         print(f"  Text-to-Speech: ✅ READY")
@@ -201,10 +209,11 @@ async def test_agent_components():
 
     # Test LLM
     try:
-        from livekit.plugins import openai as lk_openai
+        if lk_openai is None:
+            raise plugin_error
         llm = lk_openai.LLM(
             model="gpt-4-turbo",
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=openai_key
         )
         results["LLM"] = True
         print(f"  Language Model: ✅ READY")
@@ -227,10 +236,8 @@ async def test_agent_startup():
             print(f"  Main script: ❌ NOT FOUND at {main_path}")
             return False
 
-        # Try to compile the main script
-        with open(main_path, 'r') as f:
-            code = f.read()
-            compile(code, str(main_path), 'exec')
+        # Parse the main script; syntax is all this checks, so skip code generation
+        ast.parse(main_path.read_bytes(), filename=str(main_path))
 
         print(f"  Main script: ✅ VALID")
         print(f"  Location: {main_path}")
@@ -262,10 +269,19 @@ async def main():
     # Run tests
     results["Environment"] = test_environment()
     results["Dependencies"] = test_dependencies()
-    results["LiveKit Token"] = await test_livekit_token()
-    results["OpenAI API"] = await test_openai_connection()
-    results["Components"] = await test_agent_components()
-    results["Startup"] = await test_agent_startup()
+
+    # The remaining checks are independent; the OpenAI round trip overlaps the others
+    (
+        results["LiveKit Token"],
+        results["OpenAI API"],
+        results["Components"],
+        results["Startup"],
+    ) = await asyncio.gather(
+        test_livekit_token(),
+        test_openai_connection(),
+        test_agent_components(),
+        test_agent_startup(),
+    )
 
     # Summary
     print("\n" + "="*60)
@@ -4,6 +4,8 @@ Test token generation for ClaudeVoice
 This script demonstrates how tokens are generated for LiveKit
 """
 
+import base64
+import json
 import os
 import sys
 from datetime import datetime, timedelta
@@ -86,19 +88,16 @@ def decode_token(token: str) -> dict:
     Returns:
         Decoded token payload
     """
-    import base64
-    import json
-
     # JWT has 3 parts: header.payload.signature
     parts = token.split('.')
     if len(parts) != 3:
         raise ValueError("Invalid JWT format")
 
-    # Decode payload (add padding if needed)
+    # Decode payload; JWTs use unpadded base64url, so restore the padding
     payload = parts[1]
-    payload += '=' * (4 - len(payload) % 4)  # Add padding
+    payload += '=' * (-len(payload) % 4)
 
-    decoded = base64.b64decode(payload)
+    decoded = base64.urlsafe_b64decode(payload)
     return json.loads(decoded)
 
 